@@ -18,14 +18,32 @@ class Config:
     REFERENCE_COMPLETION_API_URL = os.getenv("jennie_api_url_3.5_turbo_16k")
     API_KEY = os.getenv("jennie_api_key_3.5_turbo_16k")
 
+    # Reference formatting: long references are split and formatted in parallel
+    REFERENCE_CHUNK_CHARS = int(os.getenv("REFERENCE_CHUNK_CHARS", "6000"))
+    REFERENCE_FORMAT_CONCURRENCY = int(os.getenv("REFERENCE_FORMAT_CONCURRENCY", "4"))
+    REFERENCE_MAX_TOKENS_PER_CHUNK = int(os.getenv("REFERENCE_MAX_TOKENS_PER_CHUNK", "2500"))
+
     # Azure Search
     SEARCH_END_POINT = os.getenv("jennie_search_endpoint")
     SEARCH_KEY = os.getenv("SEARCH_KEY")
+    # Multi-index fan-out: per-index time budget and size of the merged context
+    SEARCH_INDEX_BUDGET_SECS = float(os.getenv("SEARCH_INDEX_BUDGET_SECS", "4"))
+    SEARCH_MERGED_TOP_N = int(os.getenv("SEARCH_MERGED_TOP_N", "10"))
+    SEARCH_CONTEXT_MAX_CHARS = int(os.getenv("SEARCH_CONTEXT_MAX_CHARS", "16000"))
 
     # Azure Storage
     STORAGE_ACCOUNT_NAME = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
     STORAGE_ACCOUNT_KEY = os.getenv("AZURE_STORAGE_ACCOUNT_KEY")
     BLOB_SAS_TOKEN = os.getenv("blob_storage_sas_token")
+    # Point at Azurite (e.g. http://127.0.0.1:10000/devstoreaccount1) for local testing
+    BLOB_ENDPOINT_URL = os.getenv("BLOB_ENDPOINT_URL") or f"https://{STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
+
+    # Blob proxy and local disk cache
+    BLOB_PROXY_ENABLED = os.getenv("BLOB_PROXY_ENABLED", "false").lower() == "true"
+    BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", "/tmp/jennie-blob-cache")
+    BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_MB", "1024")) * 1024 * 1024
+    BLOB_CACHE_MAX_OBJECT_BYTES = int(os.getenv("BLOB_CACHE_MAX_OBJECT_MB", "100")) * 1024 * 1024
+    BLOB_CACHE_TTL_SECS = int(os.getenv("BLOB_CACHE_TTL_SECS", "300"))
 
     # Azure Speech
     SPEECH_KEY = os.getenv("SPEECH_KEY")
@@ -38,4 +56,33 @@ class Config:
     AGENT_ID = os.getenv("AGENT_ID")
     XI_API_KEY = os.getenv("XI_API_KEY")
 
+    # Adaptive max_tokens sizing
+    TOKEN_BUDGET_WINDOW = int(os.getenv("TOKEN_BUDGET_WINDOW", "200"))
+    TOKEN_BUDGET_PERCENTILE = float(os.getenv("TOKEN_BUDGET_PERCENTILE", "0.95"))
+    TOKEN_BUDGET_MARGIN = float(os.getenv("TOKEN_BUDGET_MARGIN", "0.25"))
+    TOKEN_BUDGET_FLOOR = int(os.getenv("TOKEN_BUDGET_FLOOR", "256"))
+    TOKEN_BUDGET_MIN_SAMPLES = int(os.getenv("TOKEN_BUDGET_MIN_SAMPLES", "20"))
+    TOKEN_BUDGET_MAX_CONTINUATIONS = int(os.getenv("TOKEN_BUDGET_MAX_CONTINUATIONS", "2"))
+
+    # Default overall time budget for a request, in seconds
+    REQUEST_DEADLINE_SECS = float(os.getenv("REQUEST_DEADLINE_SECS", "60"))
+
+    # Upstream HTTP connection pools
+    UPSTREAM_KEEPALIVE_SECS = float(os.getenv("UPSTREAM_KEEPALIVE_SECS", "120"))
+    UPSTREAM_PREWARM_CONNECTIONS = int(os.getenv("UPSTREAM_PREWARM_CONNECTIONS", "2"))
+
+    # Diagnostics
+    ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200"))
+
+    # Traffic capture for replay benchmarks (off unless a path is set)
+    TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH")
+    TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "0.1"))
+    TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY_KB", "256")) * 1024
+    TRAFFIC_CAPTURE_MAX_FILE_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_FILE_MB", "100")) * 1024 * 1024
+
+    # Voice answers (chat -> speech pipeline)
+    TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "3"))
+    TTS_MIN_SENTENCE_CHARS = int(os.getenv("TTS_MIN_SENTENCE_CHARS", "40"))
+
 
@@ -0,0 +1,114 @@
+# gunicorn.conf.py
+#
+# Production serving profile. gunicorn picks this file up from the working
+# directory, so the App Service startup command is just `sh startup.sh`
+# (or `gunicorn`). Every setting can be overridden from the environment.
+
+import logging
+import math
+import os
+import warnings
+
+with warnings.catch_warnings():
+    # uvicorn.workers warns that it will move to the separate uvicorn-worker
+    # package; it is still the worker shipped with the pinned uvicorn
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from uvicorn.workers import UvicornWorker
+
+try:
+    import uvloop  # noqa: F401
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    # uvloop has no Windows build
+    UVLOOP_AVAILABLE = False
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def available_cpus() -> int:
+    """CPUs this process may actually use: the cgroup quota if one is set, else the affinity mask"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+wsgi_app = "main:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# The app is async end to end, so one event loop per core saturates the CPU;
+# more workers only add memory and split the warm connection pools.
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+
+# Import the app once in the master and fork it, so workers start in
+# milliseconds and share the imported code pages. Nothing opens a connection
+# at import; `post_fork` below and the app lifespan set up each worker's pools.
+preload_app = True
+
+# Recycle workers to cap slow memory growth. The jitter keeps them from all
+# restarting at the same moment.
+max_requests = int(os.getenv("MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "500"))
+
+# Streaming routes may run for up to 120 s (see utils/deadline.py), so a
+# stopping or recycled worker gets that long to finish in-flight responses.
+# uvicorn stops waiting a little earlier so it can still cancel stragglers
+# and run the lifespan shutdown before gunicorn kills the process.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "130"))
+drain_timeout = max(1, graceful_timeout - 10)
+# A draining worker stops sending heartbeats, so the heartbeat timeout must
+# cover a full drain or recycled workers are killed mid-stream. Event loop
+# stalls are reported by the lag monitor (utils/profiling.py) instead.
+timeout = int(os.getenv("WORKER_TIMEOUT", str(graceful_timeout)))
+keepalive = int(os.getenv("KEEPALIVE_SECS", "75"))
+
+# Heartbeat files on tmpfs so a slow disk cannot stall the workers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+class TunedUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": drain_timeout,
+    }
+
+
+worker_class = TunedUvicornWorker
+
+
+def when_ready(server):
+    logger.info(
+        f"Serving with {server.cfg.workers} workers, loop={TunedUvicornWorker.CONFIG_KWARGS['loop']}, "
+        f"max_requests={max_requests}+{max_requests_jitter}, graceful_timeout={graceful_timeout}s"
+    )
+
+
+def post_fork(server, worker):
+    # Each worker gets its own upstream pools; the app lifespan warms them
+    from utils.clients import upstreams
+    upstreams.reset_after_fork()
+
@@ -1,8 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import text_to_speech, chat_completion, blob_storage, reference_generation, voice_conversation
+from routes import text_to_speech, chat_completion, blob_storage, reference_generation, voice_conversation, diagnostics
+from utils.clients import upstreams
+from utils.deadline import DeadlineMiddleware
+from utils.profiling import loop_monitor
+from utils.traffic_capture import TrafficCaptureMiddleware
+from config import Config
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker: open upstream connections before the first request
+    loop_monitor.start()
+    await upstreams.start()
+    yield
+    await upstreams.close()
+    loop_monitor.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS Configuration
 origins = [
@@ -12,6 +27,13 @@ origins = [
     
 ]
 
+# Added before CORS so that CORS stays outermost and 504s still carry its headers
+app.add_middleware(DeadlineMiddleware)
+
+# Outside the deadline middleware so cancelled and timed-out requests are recorded too
+if Config.TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(TrafficCaptureMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -28,4 +50,5 @@ app.include_router(chat_completion.router)
 app.include_router(blob_storage.router)
 app.include_router(reference_generation.router)
 app.include_router(voice_conversation.router)
+app.include_router(diagnostics.router)
 # Standard library imports
\ No newline at end of file
@@ -1,7 +1,7 @@
 # models/schemas.py
 
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, Union
 class TextToSpeechRequest(BaseModel):
     text: str
 
@@ -9,7 +9,8 @@ class ChatCompletionRequest(BaseModel):
     messages: list
     currentModel: Literal["LottieAI", "JennieAI"]
     aiModel: dict[str, str, str]
-    searchLibrary: str
+    # One index, or several to search in parallel and answer from together
+    searchLibrary: Union[str, list[str]]
 
 class BlobRequest(BaseModel):
     container_name: str
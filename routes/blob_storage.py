@@ -1,11 +1,39 @@
 # routes/blob_storage.py
 
-from fastapi import APIRouter, HTTPException
+import logging
+import os
+import re
+import time
+from typing import Optional
+from urllib.parse import quote, unquote, urlparse
+
+import anyio
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from models.schemas import BlobRequest
+from utils.blob_cache import BlobDiskCache, CachedBlob
+from utils.clients import upstreams
 from utils.helpers import generate_container_sas_token
+from config import Config
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+blob_cache = BlobDiskCache(
+    Config.BLOB_CACHE_DIR,
+    max_bytes=Config.BLOB_CACHE_MAX_BYTES,
+    max_object_bytes=Config.BLOB_CACHE_MAX_OBJECT_BYTES,
+) if Config.BLOB_PROXY_ENABLED else None
+
+_CONTAINER_NAME = re.compile(r"^[a-z0-9](?:[a-z0-9-]{1,61}[a-z0-9])$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_FORWARDED_HEADERS = ("ETag", "Last-Modified", "Content-Length", "Content-Range", "Accept-Ranges")
+_CHUNK_SIZE = 64 * 1024
+
+blob_http_client = upstreams.http("blob")
+
 @router.post("/download-blob")
 def download_blob(request: BlobRequest):
     """Generate SAS URL for blob download"""
@@ -18,3 +46,196 @@ def download_blob(request: BlobRequest):
             status_code=500,
             detail=f"An error occurred while generating the SAS URL: {str(e)}"
         )
+
+@router.get("/proxy-blob")
+async def proxy_blob(container_name: str, blob_path: str, request: Request):
+    """Stream a blob through the service, serving hot documents from the local disk cache"""
+    if blob_cache is None:
+        raise HTTPException(status_code=404, detail="Blob proxy is not enabled")
+
+    blob_name = _blob_name_from_path(container_name, blob_path)
+    key = BlobDiskCache.key_for(container_name, blob_name)
+    range_header = request.headers.get("range")
+    if_none_match = request.headers.get("if-none-match")
+
+    entry = await anyio.to_thread.run_sync(blob_cache.get, key)
+    if entry is not None and time.time() - entry.validated_at > Config.BLOB_CACHE_TTL_SECS:
+        entry = await _revalidate(entry, container_name, blob_name)
+    if entry is not None:
+        return _cached_response(entry, range_header, if_none_match)
+
+    return await _proxy_from_storage(key, container_name, blob_name, range_header, if_none_match)
+
+def _blob_name_from_path(container_name: str, blob_path: str) -> str:
+    """Accept either a full blob URL (as stored in citations) or a bare blob name"""
+    if not _CONTAINER_NAME.match(container_name):
+        raise HTTPException(status_code=400, detail="Invalid container name")
+    path = unquote(urlparse(blob_path).path if "://" in blob_path else blob_path)
+    first, _, rest = path.lstrip("/").partition("/")
+    # Only a leading container segment is stripped: `reports/docs/a.pdf` in
+    # container `docs` is the blob `reports/docs/a.pdf`, not `a.pdf`
+    blob_name = rest if first == container_name else path.lstrip("/")
+    if not blob_name or ".." in blob_name.split("/"):
+        raise HTTPException(status_code=400, detail="Invalid blob path")
+    return blob_name
+
+def _blob_url(container_name: str, blob_name: str) -> str:
+    sas_token = generate_container_sas_token(container_name, expiration_secs=300)
+    return f"{Config.BLOB_ENDPOINT_URL.rstrip('/')}/{container_name}/{quote(blob_name, safe='/')}?{sas_token}"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _parse_range(range_header: Optional[str], size: int):
+    """Return an inclusive (start, end) for a single byte range, or None to send the whole blob"""
+    if not range_header:
+        return None
+    match = _RANGE.match(range_header.strip())
+    if not match:
+        # Multiple or malformed ranges: ignoring the header is allowed by RFC 9110
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if first and last and int(last) < int(first):
+        # An invalid range, not an unsatisfiable one: ignore it like the above
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+async def _revalidate(entry: CachedBlob, container_name: str, blob_name: str) -> Optional[CachedBlob]:
+    """Check a stale cache entry's ETag against storage; serve the cached copy if storage is unreachable"""
+    try:
+        response = await blob_http_client.head(_blob_url(container_name, blob_name))
+    except httpx.HTTPError as e:
+        logger.warning(f"Blob revalidation failed, serving cached copy: {e}")
+        return entry
+    if response.status_code == 200 and response.headers.get("etag") == entry.etag:
+        await anyio.to_thread.run_sync(blob_cache.mark_validated, entry)
+        return entry
+    await anyio.to_thread.run_sync(blob_cache.discard, entry.key)
+    return None
+
+def _cached_response(entry: CachedBlob, range_header: Optional[str], if_none_match: Optional[str]):
+    headers = {
+        "ETag": entry.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={Config.BLOB_CACHE_TTL_SECS}",
+    }
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    path = blob_cache.path_for(entry.key)
+    byte_range = _parse_range(range_header, entry.size)
+    if byte_range is None:
+        return FileResponse(path, media_type=entry.content_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{entry.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_file_range(path, start, end),
+        status_code=206,
+        media_type=entry.content_type,
+        headers=headers
+    )
+
+async def _read_file_range(path: str, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+async def _proxy_from_storage(key: str, container_name: str, blob_name: str,
+                              range_header: Optional[str], if_none_match: Optional[str]):
+    headers = {}
+    if range_header:
+        headers["Range"] = range_header
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
+
+    try:
+        upstream = await blob_http_client.send(
+            blob_http_client.build_request("GET", _blob_url(container_name, blob_name), headers=headers),
+            stream=True
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to reach blob storage: {str(e)}")
+
+    response_headers = {name: upstream.headers[name] for name in _FORWARDED_HEADERS if name in upstream.headers}
+    if upstream.status_code == 304 or upstream.status_code >= 400:
+        await upstream.aclose()
+        if upstream.status_code == 304:
+            return Response(status_code=304, headers=response_headers)
+        if upstream.status_code in (404, 416):
+            raise HTTPException(status_code=upstream.status_code, detail="Blob not available", headers=response_headers)
+        raise HTTPException(status_code=502, detail=f"Blob storage returned {upstream.status_code}")
+
+    content_type = upstream.headers.get("content-type", "application/octet-stream")
+    etag = upstream.headers.get("etag")
+    content_length = int(upstream.headers.get("content-length", "0"))
+    # Only whole, unencoded blobs with a validator are worth keeping
+    cacheable = (
+        upstream.status_code == 200
+        and etag is not None
+        and "content-encoding" not in upstream.headers
+        and content_length <= Config.BLOB_CACHE_MAX_OBJECT_BYTES
+    )
+    body = _stream_and_cache(upstream, key, etag, content_type) if cacheable else _stream_through(upstream)
+    return StreamingResponse(
+        body,
+        status_code=upstream.status_code,
+        media_type=content_type,
+        headers={**response_headers, "Accept-Ranges": "bytes"}
+    )
+
+async def _stream_through(upstream: httpx.Response):
+    try:
+        async for chunk in upstream.aiter_raw():
+            yield chunk
+    finally:
+        await upstream.aclose()
+
+async def _stream_and_cache(upstream: httpx.Response, key: str, etag: str, content_type: str):
+    """Relay the blob to the client while writing it to the cache; only complete downloads are kept"""
+    temp_path = blob_cache.new_temp_path()
+    complete = False
+    try:
+        async with await anyio.open_file(temp_path, "wb") as f:
+            async for chunk in upstream.aiter_raw():
+                await f.write(chunk)
+                yield chunk
+        complete = True
+    finally:
+        # Shielded so the temp file is still committed or removed when the
+        # client disconnects mid-stream
+        with anyio.CancelScope(shield=True):
+            await upstream.aclose()
+            if complete:
+                await anyio.to_thread.run_sync(blob_cache.commit, key, temp_path, etag, content_type)
+            else:
+                await anyio.to_thread.run_sync(_remove_temp, temp_path)
+
+def _remove_temp(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,9 +1,12 @@
-from tenacity import retry, stop_after_attempt, wait_fixed
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_fixed
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from models.schemas import ChatCompletionRequest
-from utils.clients import client
+from utils.clients import client, UPSTREAMS
 from utils.helpers import _get_role_information
+from utils.search import fields_mapping, top_n_documents, search_indexes, merge_results
+from utils.token_budget import complete_with_continuation
+from utils.deadline import DeadlineExceeded, bounded_timeout, stop_when_deadline_near
 from config import Config
 import json
 import asyncio
@@ -15,7 +18,14 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@retry(stop=stop_after_attempt(2), wait=wait_fixed(1))
+# Largest max_tokens each route may request; the actual value adapts to
+# recent answer lengths (see utils/token_budget.py)
+LOTTIE_MAX_TOKENS = 4096
+SEARCH_MAX_TOKENS = 1000
+
+# Retries share the request's deadline: no new attempt without time left for it
+@retry(stop=stop_after_attempt(2) | stop_when_deadline_near, wait=wait_fixed(1),
+       retry=retry_if_not_exception_type(DeadlineExceeded), reraise=True)
 async def _retry_request(func, *args, **kwargs):
     print("retrying...")
     return await func(*args, **kwargs)
@@ -42,6 +52,8 @@ async def get_chat_completion(request: ChatCompletionRequest):
             logger.info(f"Total search completion took: {time.time() - search_start:.2f} seconds")
            
         return response
+    except DeadlineExceeded as de:
+        raise HTTPException(status_code=504, detail=str(de))
     except ValueError as ve:
         print("value error")
         print(ve)
@@ -52,7 +64,7 @@ async def get_chat_completion(request: ChatCompletionRequest):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 # Helper functions specific to chat completion
-async def _handle_lottie_ai_completion(model: str, messages: list):
+async def _handle_lottie_ai_completion(model: str, messages: list, stream: bool = False):
     """Handle LottieAI-specific chat completion."""
     system_message = {
         "role": "system",
@@ -64,16 +76,22 @@ async def _handle_lottie_ai_completion(model: str, messages: list):
         )
     }
 
-    return await client.chat.completions.create(
-        model=model,
-        messages=[system_message] + messages,
-        max_tokens=4096,
-        temperature=0.7,
-        top_p=1.0,
-        frequency_penalty=0,
-        presence_penalty=0,
-        stop=None,
-        stream=False
+    params = {
+        "model": model,
+        "temperature": 0.7,
+        "top_p": 1.0,
+        "frequency_penalty": 0,
+        "presence_penalty": 0,
+        "stop": None,
+        "timeout": bounded_timeout(UPSTREAMS["openai"]["timeout"].read)
+    }
+    if stream:
+        return await client.chat.completions.create(
+            messages=[system_message] + messages, max_tokens=LOTTIE_MAX_TOKENS, stream=True, **params
+        )
+    return await complete_with_continuation(
+        client.chat.completions.create, ("lottie", model, None), LOTTIE_MAX_TOKENS,
+        [system_message] + messages, default_timeout=UPSTREAMS["openai"]["timeout"].read, **params
     )
 
 async def _handle_search_based_completion(model: str, request: ChatCompletionRequest, stream: bool = False):
@@ -82,29 +100,27 @@ async def _handle_search_based_completion(model: str, request: ChatCompletionReq
     print("search library", request.searchLibrary)
     print("model", model)
     print("messages", request.messages)
-    fields_mapping = {
-        "content_fields_separator": "\n",
-        "content_fields": ["content"],
-        "filepath_field": "filepath" if request.searchLibrary == "jennie-v1" else "file_name",
-        "title_field": "title" if request.searchLibrary == "jennie-v1" else "sub_title",
-        "url_field": "url" if request.searchLibrary == "jennie-v1" else "file_url",
-        "vector_fields": ["contentVector"] if request.searchLibrary == "jennie-v1" else ["vector"]
-    }
+    libraries = [request.searchLibrary] if isinstance(request.searchLibrary, str) else list(dict.fromkeys(request.searchLibrary))
+    if not libraries:
+        raise ValueError("At least one search library is required.")
+    if len(libraries) > 1:
+        return await _handle_multi_index_completion(model, request.messages, libraries, stream)
+    index_name = libraries[0]
 
     data_source = {
         "type": "azure_search",
         "parameters": {
             "endpoint": Config.SEARCH_END_POINT,
-            "index_name": request.searchLibrary,
+            "index_name": index_name,
             "semantic_configuration": "default",
             "query_type": "vector_semantic_hybrid",
-            "fields_mapping": fields_mapping,
+            "fields_mapping": fields_mapping(index_name),
             "include_contexts": ["citations", "intent", "all_retrieved_documents"],
             "in_scope": True,
             "role_information": _get_role_information(),
             "filter": None,
             "strictness": 2,
-            "top_n_documents": 5 if request.searchLibrary == "jennie-v1" else 20,
+            "top_n_documents": top_n_documents(index_name),
             "authentication": {
                 "type": "api_key",
                 "key": Config.SEARCH_KEY
@@ -118,20 +134,144 @@ async def _handle_search_based_completion(model: str, request: ChatCompletionReq
 
     base_params = {
         "model": model,
-        "messages": request.messages,
-        "max_tokens": 1000,
         "temperature": 0.3,
         "top_p": 0.6,
         "frequency_penalty": 0.2,
         "presence_penalty": 0.0,
         "stop": None,
-        "stream": stream
+        "extra_body": {"data_sources": [data_source]},
+        "timeout": bounded_timeout(UPSTREAMS["openai"]["timeout"].read)
     }
     logger.info(f"Search configuration took: {time.time() - pre_search:.2f} seconds")
     
     # Log actual API call time
     api_start = time.time()
-    response = await client.chat.completions.create(**base_params, extra_body={"data_sources": [data_source]})
+    if stream:
+        response = await client.chat.completions.create(
+            messages=request.messages, max_tokens=SEARCH_MAX_TOKENS, stream=True, **base_params
+        )
+    else:
+        response = await complete_with_continuation(
+            client.chat.completions.create, ("search", model, index_name), SEARCH_MAX_TOKENS,
+            request.messages, follow_up=_grounded_follow_up(request.messages, base_params),
+            default_timeout=UPSTREAMS["openai"]["timeout"].read, **base_params
+        )
     logger.info(f"API call took: {time.time() - api_start:.2f} seconds")
     
-    return response
\ No newline at end of file
+    return response
+
+async def _handle_multi_index_completion(model: str, messages: list, libraries: list, stream: bool = False):
+    """
+    Answer from several indexes at once: search them in parallel, rerank the
+    hits together and ground a single completion on the merged context.
+    """
+    query = _last_user_message(messages)
+    search_start = time.time()
+    vector = await _embed_query(query)
+    documents = merge_results(await search_indexes(libraries, query, vector))
+    logger.info(f"Multi-index search over {libraries} took: {time.time() - search_start:.2f} seconds")
+
+    system_message = _grounding_message(documents)
+
+    params = {
+        "model": model,
+        "temperature": 0.3,
+        "top_p": 0.6,
+        "frequency_penalty": 0.2,
+        "presence_penalty": 0.0,
+        "stop": None,
+        "timeout": bounded_timeout(UPSTREAMS["openai"]["timeout"].read)
+    }
+    if stream:
+        return await client.chat.completions.create(
+            messages=[system_message] + messages, max_tokens=SEARCH_MAX_TOKENS, stream=True, **params
+        )
+    response = await complete_with_continuation(
+        client.chat.completions.create, ("search", model, "+".join(sorted(libraries))), SEARCH_MAX_TOKENS,
+        [system_message] + messages, default_timeout=UPSTREAMS["openai"]["timeout"].read, **params
+    )
+
+    # Same shape as the single-index "on your data" response, so the frontend
+    # renders citations the same way
+    result = response.model_dump()
+    result["choices"][0]["message"]["context"] = {
+        "intent": query,
+        "citations": [
+            {
+                "content": document["content"],
+                "title": document["title"],
+                "url": document["url"],
+                "filepath": document["filepath"],
+                "chunk_id": str(number - 1),
+                "index_name": document["index"],
+            }
+            for number, document in enumerate(documents, start=1)
+        ],
+    }
+    return result
+
+def _grounding_message(documents: list) -> dict:
+    """System message that grounds a completion on documents numbered as [docN] citations"""
+    sources = "\n\n".join(
+        f"[doc{number}] {document.get('title') or document.get('filepath')}\n{document.get('content') or ''}"
+        for number, document in enumerate(documents, start=1)
+    )
+    return {
+        "role": "system",
+        "content": (
+            _get_role_information()
+            + "\n\n## Retrieved documents\n"
+            "Answer only from the documents below and cite them as [docN]. If they do not contain "
+            "the answer, say that the requested information is not available in the retrieved data.\n\n"
+            + sources
+        )
+    }
+
+def _grounded_follow_up(messages: list, params: dict):
+    """
+    Continue an "on your data" answer from the documents the first call
+    retrieved, without data_sources: retrieving again would search for the
+    continue prompt and renumber the [docN] citations the text refers to.
+    """
+    def follow_up(response):
+        context = (response.choices[0].message.model_extra or {}).get("context") or {}
+        follow_up_params = {name: value for name, value in params.items() if name != "extra_body"}
+        return [_grounding_message(context.get("citations") or [])] + messages, follow_up_params
+    return follow_up
+
+def _last_user_message(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            if isinstance(content, list):
+                return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+            return content or ""
+    raise ValueError("No user message to search for.")
+
+async def _embed_query(query: str):
+    """Embed the query once for all indexes; fall back to semantic-only search if that fails"""
+    try:
+        embedding = await client.embeddings.create(
+            model="embeddings",
+            input=query,
+            timeout=bounded_timeout(Config.SEARCH_INDEX_BUDGET_SECS)
+        )
+        return embedding.data[0].embedding
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.warning(f"Query embedding failed, searching without vectors: {e}")
+        return None
+
+async def _iter_completion_tokens(response):
+    """Yield the text deltas of a streamed chat completion, closing it when done."""
+    try:
+        async for chunk in response:
+            # Azure sends content filter results in chunks without choices
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta and delta.content:
+                yield delta.content
+    finally:
+        await response.close()
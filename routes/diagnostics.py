@@ -0,0 +1,58 @@
+# routes/diagnostics.py
+
+import asyncio
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from utils.clients import upstreams
+from utils import deadline
+from utils.profiling import ProfilerBusy, loop_monitor, sample_stacks
+from utils.token_budget import token_budget
+from routes.blob_storage import blob_cache
+from config import Config
+
+router = APIRouter()
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Allow the request only with the configured admin key; without one, admin routes are off"""
+    if not Config.ADMIN_API_KEY or not x_admin_key or not secrets.compare_digest(x_admin_key, Config.ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@router.get("/health/live")
+async def liveness():
+    """The worker's event loop answers and its upstream clients have not been closed"""
+    health = upstreams.health()
+    alive = all(pool["open"] for pool in health["pools"].values())
+    return JSONResponse(
+        {"status": "ok" if alive else "failed", "event_loop": loop_monitor.stats()},
+        status_code=200 if alive else 503
+    )
+
+@router.get("/health/ready")
+async def readiness():
+    """The worker has finished pre-warming its upstream pools and none of them is saturated"""
+    health = upstreams.health()
+    return JSONResponse(health, status_code=200 if health["ready"] else 503)
+
+@router.get("/metrics")
+async def get_metrics():
+    """Report upstream pool utilization, cache statistics and abandoned work"""
+    return {
+        "upstreams": upstreams.stats(),
+        "blob_cache": blob_cache.stats() if blob_cache is not None else None,
+        "abandoned_requests": deadline.stats(),
+        "event_loop": loop_monitor.stats(),
+        # max_tokens no longer reserved against deployment TPM limits
+        "token_budget": token_budget.stats(),
+    }
+
+@router.get("/admin/profile", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def profile_worker(seconds: float = Query(10, gt=0, le=60), hz: int = Query(100, ge=1, le=1000)):
+    """Sample this worker's stacks for a while and return them in folded (flamegraph) format"""
+    try:
+        folded = await asyncio.to_thread(sample_stacks, seconds, hz)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded)
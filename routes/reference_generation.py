@@ -1,17 +1,69 @@
 # routes/reference_generation.py
 
 from fastapi import APIRouter, HTTPException, Request
-from utils.clients import client
-from utils.helpers import _get_reference_system_prompt
+from fastapi.responses import StreamingResponse
+from utils.clients import client, upstreams, UPSTREAMS
+from utils.helpers import _get_reference_system_prompt, split_reference
+from utils.deadline import DeadlineExceeded, bounded_timeout
 from config import Config
-import requests
+import asyncio
+import json
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+REFERENCE_MODEL = "Jennei-gpt-35-turbo-16k"
+
 @router.post("/getReference")
 async def get_reference(request: Request):
-    """Generate formatted reference text"""
+    """Generate formatted reference text, formatting long references chunk by chunk in parallel"""
+    body = await request.json()
+    tasks = _start_formatting(body.get('reference'))
+
+    try:
+        responses = await asyncio.gather(*tasks)
+    except DeadlineExceeded as de:
+        raise HTTPException(status_code=504, detail=str(de))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if len(responses) == 1:
+        return responses[0]
+    return _stitch(responses)
+
+@router.post("/getReferenceStream")
+async def get_reference_stream(request: Request):
+    """Stream formatted reference text in order, each chunk as soon as it and those before it are done"""
     body = await request.json()
+    tasks = _start_formatting(body.get('reference'))
+
+    async def stream_chunks():
+        try:
+            for task in tasks:
+                response = await task
+                yield json.dumps({'content': response.choices[0].message.content or ""}) + '\n\n'
+        except Exception as e:
+            logger.error(f"Reference formatting failed: {e}")
+            yield json.dumps({'error': str(e)}) + '\n\n'
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_chunks(), media_type='application/json')
+
+def _start_formatting(reference) -> list:
+    """Split the reference on structural boundaries and start formatting every chunk, a bounded number at a time"""
+    chunks = split_reference(reference, Config.REFERENCE_CHUNK_CHARS) if reference else []
+    slots = asyncio.Semaphore(Config.REFERENCE_FORMAT_CONCURRENCY)
+    return [asyncio.create_task(_format_chunk(chunk, slots)) for chunk in chunks or [reference]]
+
+async def _format_chunk(chunk: str, slots: asyncio.Semaphore):
     prompt = [
         {
             "role": "system",
@@ -19,25 +71,36 @@ async def get_reference(request: Request):
         },
         {
             "role": "user",
-            "content": body.get('reference')
+            "content": chunk
         }
     ]
-
-    try:
-        response = client.chat.completions.create(
-            model="Jennei-gpt-35-turbo-16k",
+    # Reformatted text is about as long as its input (~4 chars per token)
+    max_tokens = min(len(chunk or "") // 3 + 100, Config.REFERENCE_MAX_TOKENS_PER_CHUNK)
+    async with slots:
+        return await client.chat.completions.create(
+            model=REFERENCE_MODEL,
             messages=prompt,
-            max_tokens=500,
+            max_tokens=max_tokens,
             temperature=0.2,
             top_p=0.8,
             frequency_penalty=0,
             presence_penalty=0,
             stop=None,
-            stream=False
+            stream=False,
+            timeout=bounded_timeout(UPSTREAMS["openai"]["timeout"].read)
         )
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+def _stitch(responses: list) -> dict:
+    """Join per-chunk completions back into one completion-shaped response"""
+    result = responses[0].model_dump()
+    choice = result["choices"][0]
+    choice["message"]["content"] = "\n\n".join(r.choices[0].message.content or "" for r in responses)
+    choice["finish_reason"] = "length" if any(r.choices[0].finish_reason == "length" for r in responses) else "stop"
+    result["usage"] = {
+        key: sum(getattr(r.usage, key) for r in responses if r.usage)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    return result
 
 @router.post("/generateTitle")
 async def generate_title(request: Request):
@@ -60,7 +123,7 @@ async def generate_title(request: Request):
     }
 
     try:
-        response = requests.post(
+        response = await upstreams.http("reference").post(
             Config.REFERENCE_COMPLETION_API_URL,
             json={
                 "messages": prompt,
@@ -75,5 +138,5 @@ async def generate_title(request: Request):
         )
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=str(e))
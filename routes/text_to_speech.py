@@ -4,8 +4,11 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 import io
 from azure.cognitiveservices.speech import SpeechSynthesizer, audio, ResultReason
-from models.schemas import TextToSpeechRequest
+from models.schemas import TextToSpeechRequest, ChatCompletionRequest
 from utils.clients import speech_config
+from utils.speech import stream_speech
+from utils.deadline import DeadlineExceeded
+from routes.chat_completion import _handle_lottie_ai_completion, _handle_search_based_completion, _iter_completion_tokens
 from threading import Lock
 import uuid
 from fastapi.responses import JSONResponse
@@ -32,3 +35,25 @@ async def text_to_speech(request: TextToSpeechRequest):
         raise Exception("Speech synthesis failed.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/chat-to-speech")
+async def chat_to_speech(request: ChatCompletionRequest):
+    """Stream a spoken chat answer, synthesizing each sentence as soon as it is generated"""
+    model = request.aiModel["deploymentName"]
+    if not model:
+        raise HTTPException(status_code=400, detail="Model deployment name is not configured properly.")
+
+    try:
+        if request.currentModel == "LottieAI":
+            completion = await _handle_lottie_ai_completion(model, request.messages, stream=True)
+        else:
+            completion = await _handle_search_based_completion(model, request, stream=True)
+    except DeadlineExceeded as de:
+        raise HTTPException(status_code=504, detail=str(de))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+    return StreamingResponse(
+        stream_speech(_iter_completion_tokens(completion)),
+        media_type="audio/mpeg"
+    )
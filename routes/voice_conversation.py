@@ -7,6 +7,7 @@ import os
 from dotenv import load_dotenv
 
 from config import Config
+from utils.clients import upstreams
 
 # Load environment variables
 load_dotenv()
@@ -27,18 +28,17 @@ async def get_signed_url():
     
     url = f"https://api.elevenlabs.io/v1/convai/conversation/get_signed_url?agent_id={agent_id}"
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                url,
-                headers={"xi-api-key": xi_api_key}
-            )
-            response.raise_for_status()
-            data = response.json()
-            return {"signedUrl": data["signed_url"]}
-            
-        except httpx.HTTPError:
-            raise HTTPException(status_code=500, detail="Failed to get signed URL")
+    try:
+        response = await upstreams.http("elevenlabs").get(
+            url,
+            headers={"xi-api-key": xi_api_key}
+        )
+        response.raise_for_status()
+        data = response.json()
+        return {"signedUrl": data["signed_url"]}
+
+    except httpx.HTTPError:
+        raise HTTPException(status_code=500, detail="Failed to get signed URL")
 
 
 #API route for getting Agent ID, used for public agents
@@ -0,0 +1,4 @@
+#!/bin/sh
+# App Service startup command: sh startup.sh
+# Worker count, recycling and drain settings live in gunicorn.conf.py
+exec gunicorn --config gunicorn.conf.py
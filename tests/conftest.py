@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# The app reads its settings at import time; give it enough to import
+# without real credentials. Nothing in the tests talks to Azure.
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "test")
+os.environ.setdefault("ENDPOINT_URL", "https://test.openai.azure.com")
+os.environ.setdefault("SPEECH_KEY", "test")
+os.environ.setdefault("SPEECH_REGION", "westus")
+os.environ.setdefault("AZURE_STORAGE_ACCOUNT_NAME", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_completion():
+    """Factory for the ChatCompletion responses a fake `create` returns"""
+    from openai.types.chat import ChatCompletion
+
+    def make(content: str, finish_reason: str, context=None, prompt_tokens: int = 100, completion_tokens: int = 50):
+        message = {"role": "assistant", "content": content}
+        if context is not None:
+            message["context"] = context
+        return ChatCompletion.model_validate({
+            "id": "test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    return make
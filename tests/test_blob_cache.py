@@ -0,0 +1,82 @@
+import os
+
+from utils.blob_cache import BlobDiskCache
+
+
+def _put(cache: BlobDiskCache, key: str, size: int):
+    temp_path = cache.new_temp_path()
+    with open(temp_path, "wb") as f:
+        f.write(b"x" * size)
+    return cache.commit(key, temp_path, etag=f'"{key}"', content_type="application/pdf")
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    cache = BlobDiskCache(str(tmp_path), max_bytes=30, max_object_bytes=30)
+    _put(cache, "a", 10)
+    _put(cache, "b", 10)
+    _put(cache, "c", 10)
+    assert cache.get("a") is not None
+
+    _put(cache, "d", 10)
+
+    assert cache.get("b") is None
+    assert not os.path.exists(cache.path_for("b"))
+    assert [key for key in ("a", "c", "d") if cache.get(key) is not None] == ["a", "c", "d"]
+    assert cache.stats()["bytes"] == 30
+
+
+def test_rejects_objects_over_the_limit(tmp_path):
+    cache = BlobDiskCache(str(tmp_path), max_bytes=100, max_object_bytes=10)
+    temp_path = cache.new_temp_path()
+    with open(temp_path, "wb") as f:
+        f.write(b"x" * 11)
+
+    assert cache.commit("big", temp_path, etag='"big"', content_type="application/pdf") is None
+    assert not os.path.exists(temp_path)
+    assert cache.stats()["blobs"] == 0
+
+
+def test_replacing_a_blob_does_not_double_count(tmp_path):
+    cache = BlobDiskCache(str(tmp_path), max_bytes=100, max_object_bytes=100)
+    _put(cache, "a", 40)
+    _put(cache, "a", 20)
+    assert cache.stats()["bytes"] == 20
+
+
+def test_reload_keeps_entries_and_drops_temp_files(tmp_path):
+    cache = BlobDiskCache(str(tmp_path), max_bytes=100, max_object_bytes=100)
+    _put(cache, "a", 10)
+    leftover = cache.new_temp_path()
+    open(leftover, "wb").close()
+
+    reloaded = BlobDiskCache(str(tmp_path), max_bytes=100, max_object_bytes=100)
+
+    assert reloaded.get("a").etag == '"a"'
+    assert not os.path.exists(leftover)
+
+
+def test_miss_when_another_worker_removed_the_file(tmp_path):
+    cache = BlobDiskCache(str(tmp_path), max_bytes=100, max_object_bytes=100)
+    _put(cache, "a", 10)
+    os.remove(cache.path_for("a"))
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_bound_covers_blobs_cached_by_other_workers(tmp_path):
+    first = BlobDiskCache(str(tmp_path), max_bytes=30, max_object_bytes=30)
+    second = BlobDiskCache(str(tmp_path), max_bytes=30, max_object_bytes=30)
+    _put(first, "a", 10)
+    _put(first, "b", 10)
+    _put(second, "c", 10)
+    # A hit in one worker keeps the blob over older ones in the other
+    os.utime(first.path_for("a"), (1, 1))
+    os.utime(first.path_for("b"), (2, 2))
+    assert first.get("a") is not None
+
+    _put(second, "d", 10)
+
+    blobs = sorted(name for name in os.listdir(tmp_path) if name.endswith(".blob"))
+    assert blobs == sorted(f"{key}.blob" for key in ("a", "c", "d"))
+    assert first.get("b") is None
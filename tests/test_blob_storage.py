@@ -0,0 +1,63 @@
+import pytest
+from fastapi import HTTPException
+
+from routes.blob_storage import _blob_name_from_path, _etag_matches, _parse_range
+
+
+def test_blob_name_from_full_url_strips_container():
+    url = "https://acct.blob.core.windows.net/docs/folder/My%20File.pdf"
+    assert _blob_name_from_path("docs", url) == "folder/My File.pdf"
+
+
+def test_blob_name_strips_only_a_leading_container_segment():
+    assert _blob_name_from_path("docs", "docs/file.pdf") == "file.pdf"
+    assert _blob_name_from_path("docs", "reports/docs/file.pdf") == "reports/docs/file.pdf"
+    assert _blob_name_from_path("docs", "x/docs/y") == "x/docs/y"
+
+
+@pytest.mark.parametrize("container_name, blob_path", [
+    ("Docs", "file.pdf"),
+    ("docs", "docs/"),
+    ("docs", "a/../../secrets"),
+])
+def test_blob_name_rejects_invalid_input(container_name, blob_path):
+    with pytest.raises(HTTPException) as error:
+        _blob_name_from_path(container_name, blob_path)
+    assert error.value.status_code == 400
+
+
+def test_etag_matches():
+    assert not _etag_matches(None, '"a"')
+    assert _etag_matches('"a"', '"a"')
+    assert _etag_matches('"b", W/"a"', '"a"')
+    assert _etag_matches("*", '"a"')
+    assert not _etag_matches('"b"', '"a"')
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=5-", (5, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=-", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=10-5", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=100-", 100),
+    ("bytes=100-200", 100),
+    ("bytes=-0", 100),
+    ("bytes=0-", 0),
+])
+def test_unsatisfiable_range(header, size):
+    with pytest.raises(HTTPException) as error:
+        _parse_range(header, size)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == f"bytes */{size}"
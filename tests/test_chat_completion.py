@@ -0,0 +1,45 @@
+import asyncio
+import re
+
+from routes.chat_completion import _grounded_follow_up
+from utils.token_budget import complete_with_continuation
+
+CITATIONS = [
+    {"title": "Handbook", "filepath": "handbook.pdf", "content": "Onboarding takes two weeks."},
+    {"title": "Policy", "filepath": "policy.pdf", "content": "Laptops are issued on day one."},
+]
+
+
+def test_continued_search_answer_keeps_matching_citations(make_completion):
+    calls = []
+    replies = [
+        make_completion("Onboarding takes two weeks [doc1]", "length", {"citations": CITATIONS, "intent": "onboarding"}),
+        make_completion(" and laptops arrive on day one [doc2].", "stop"),
+    ]
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return replies[len(calls) - 1]
+
+    messages = [{"role": "user", "content": "How does onboarding work?"}]
+    params = {"model": "test", "extra_body": {"data_sources": [{"type": "azure_search"}]}}
+    response = asyncio.run(complete_with_continuation(
+        create, ("test-search", "test", "index"), 1000, messages,
+        follow_up=_grounded_follow_up(messages, params), **params
+    ))
+
+    assert len(calls) == 2
+    # The continuation does not retrieve again...
+    assert "extra_body" not in calls[1]
+    # ...it is grounded on the documents the first call cited, in the same order
+    grounding = calls[1]["messages"][0]
+    assert grounding["role"] == "system"
+    assert "[doc1] Handbook\nOnboarding takes two weeks." in grounding["content"]
+    assert "[doc2] Policy\nLaptops are issued on day one." in grounding["content"]
+
+    message = response.choices[0].message
+    assert message.content == "Onboarding takes two weeks [doc1] and laptops arrive on day one [doc2]."
+    citations = message.model_extra["context"]["citations"]
+    assert citations == CITATIONS
+    for number in re.findall(r"\[doc(\d+)\]", message.content):
+        assert 1 <= int(number) <= len(citations)
@@ -0,0 +1,73 @@
+import asyncio
+
+from utils import deadline
+from utils.deadline import DeadlineMiddleware
+
+
+def _scope(path: str) -> dict:
+    return {"type": "http", "method": "GET", "path": path, "headers": []}
+
+
+async def _call(app, path: str, disconnect_after_response: bool = True, disconnect_early: bool = False):
+    """Drive DeadlineMiddleware the way uvicorn does: receive() reports the disconnect once the body is sent"""
+    sent = []
+    response_done = asyncio.Event()
+    body_delivered = False
+
+    async def receive():
+        nonlocal body_delivered
+        if disconnect_early:
+            await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+        if not body_delivered:
+            body_delivered = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        if not disconnect_after_response:
+            await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await DeadlineMiddleware(app)(_scope(path), receive, send)
+    return sent
+
+
+def test_disconnect_after_response_does_not_cancel_background_work():
+    background_done = []
+
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+        # Starlette runs BackgroundTasks here, after the body went out
+        await asyncio.sleep(0.05)
+        background_done.append(True)
+
+    path = "/test-background"
+    sent = asyncio.run(_call(app, path))
+
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+    assert background_done == [True]
+    assert path not in deadline.stats()
+
+
+def test_disconnect_before_response_cancels_handler():
+    cancelled = []
+
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    path = "/test-disconnect"
+    sent = asyncio.run(_call(app, path, disconnect_early=True))
+
+    assert sent == []
+    assert cancelled == [True]
+    assert deadline.stats()[path]["disconnected"] == 1
@@ -0,0 +1,86 @@
+import re
+
+from utils.helpers import split_reference
+
+
+def _words(chunks: list) -> list:
+    return re.split(r"\s+", " ".join(chunks).strip())
+
+
+def test_short_reference_is_one_chunk():
+    text = "Smith, J. (2020). A title.\n\nJones, K. (2021). Another."
+    assert split_reference(text, 500) == [text]
+
+
+def test_paragraphs_are_packed_up_to_the_limit():
+    text = "\n\n".join(["a" * 40] * 5)
+    chunks = split_reference(text, 100)
+    assert chunks == ["a" * 40 + "\n\n" + "a" * 40] * 2 + ["a" * 40]
+
+
+def test_long_paragraph_is_cut_at_sentences():
+    text = " ".join(f"Sentence number {i}." for i in range(40))
+    chunks = split_reference(text, 120)
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert _words(chunks) == _words([text])
+
+
+def test_unbroken_text_is_hard_cut():
+    chunks = split_reference("y" * 250, 100)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+
+def test_section_starts_a_new_chunk_once_half_full():
+    text = "# One\n\n" + "a" * 60 + "\n\n# Two\n\n" + "b" * 20
+    chunks = split_reference(text, 100)
+    assert chunks == ["# One\n\n" + "a" * 60, "# Two\n\n" + "b" * 20]
+
+
+def test_heading_stays_with_its_text_within_the_limit():
+    chunks = split_reference("# H\n\n" + "y" * 1000, 500)
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert chunks[0].startswith("# H\n\ny")
+    assert "".join(chunks).replace("\n", "") == "# H" + "y" * 1000
+
+
+def _reference_list(count: int) -> str:
+    # Entry-per-line, no blank lines, no terminal punctuation
+    return "\n".join(
+        f"Author{i}, A. and Other, B. ({2000 + i % 20}) Title of work {i}, Journal {i}, https://doi.org/10.1000/{i}"
+        for i in range(count)
+    )
+
+
+def test_line_separated_list_is_cut_between_lines():
+    text = _reference_list(300)
+    chunks = split_reference(text, 1000)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    # No chunk boundary inside an entry, and every line break is kept
+    assert "\n".join(chunks) == text
+    lines = text.split("\n")
+    assert sum(chunk.count("\n") for chunk in chunks) + len(chunks) - 1 == len(lines) - 1
+
+
+def test_heading_then_list_keeps_entries_whole():
+    entries = _reference_list(40)
+    chunks = split_reference("REFERENCES\n\n" + entries, 1000)
+    assert chunks[0].startswith("REFERENCES\n\n")
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert "\n".join(chunks).replace("REFERENCES\n\n", "", 1) == entries
+
+
+def test_only_a_line_longer_than_the_limit_is_hard_cut():
+    long_line = "z" * 250
+    text = "short entry one\n" + long_line + "\nshort entry two"
+    chunks = split_reference(text, 100)
+    assert chunks == ["short entry one", "z" * 100, "z" * 100, "z" * 50 + "\nshort entry two"]
+
+
+def test_sentence_separators_are_kept():
+    line = "First sentence here.  Second one follows!\tThird ends? Fourth."
+    chunks = split_reference(line, 45)
+    assert all(len(chunk) <= 45 for chunk in chunks)
+    assert " ".join(chunks).split() == line.split()
+    assert chunks[0] == "First sentence here.  Second one follows!"
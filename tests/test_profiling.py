@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+from utils.profiling import LoopLagMonitor
+
+
+async def _block_loop(monitor: LoopLagMonitor, seconds: float):
+    monitor.start()
+    try:
+        # Let a few heartbeats land, then block just before the next one is due
+        await asyncio.sleep(monitor.interval * 3.8)
+        time.sleep(seconds)
+        # Give the watchdog time to look at the blocked heartbeat
+        await asyncio.sleep(monitor.interval * 3)
+    finally:
+        monitor.stop()
+
+
+def test_block_shorter_than_threshold_is_not_reported():
+    monitor = LoopLagMonitor(threshold=0.2, interval=0.1)
+    asyncio.run(_block_loop(monitor, 0.17))
+    assert monitor.stalls == 0
+
+
+def test_block_longer_than_threshold_is_reported_once():
+    monitor = LoopLagMonitor(threshold=0.1, interval=0.05)
+    asyncio.run(_block_loop(monitor, 0.4))
+    assert monitor.stalls == 1
+    assert monitor.max_lag >= 0.3
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import httpx
+
+from config import Config
+from utils.clients import upstreams
+from utils.search import merge_results, search_indexes
+
+
+def _document(index: str, score: float, content: str) -> dict:
+    return {"index": index, "score": score, "content": content}
+
+
+def test_documents_from_all_indexes_are_ranked_together():
+    documents = [
+        _document("a", 0.5, "a1"),
+        _document("a", 0.9, "a2"),
+        _document("b", 0.7, "b1"),
+    ]
+    merged = merge_results(documents, top_n=2, max_chars=100)
+    assert [(d["index"], d["content"]) for d in merged] == [("a", "a2"), ("b", "b1")]
+
+
+def test_context_is_trimmed_to_max_chars():
+    documents = [_document("a", 0.9, "x" * 60), _document("b", 0.8, "y" * 60), _document("c", 0.7, "z" * 10)]
+    merged = merge_results(documents, top_n=10, max_chars=100)
+    assert [d["content"] for d in merged] == ["x" * 60, "y" * 40]
+
+
+def test_inputs_are_not_modified():
+    documents = [_document("a", 0.9, "x" * 60)]
+    merge_results(documents, top_n=10, max_chars=10)
+    assert documents[0]["content"] == "x" * 60
+
+
+def test_no_documents():
+    assert merge_results([], top_n=5, max_chars=100) == []
+
+
+def test_fan_out_skips_slow_failing_and_malformed_indexes(monkeypatch):
+    budget = 0.5
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        index_name = request.url.path.split("/")[2]
+        if index_name == "slow":
+            await asyncio.sleep(budget * 4)
+        if index_name == "failing":
+            return httpx.Response(503, json={"error": "unavailable"})
+        if index_name == "malformed":
+            return httpx.Response(200, content=b"<html>gateway</html>")
+        return httpx.Response(200, json={"value": [
+            {"content": "Onboarding takes two weeks.", "sub_title": "Handbook", "@search.rerankerScore": 3.1},
+        ]})
+
+    monkeypatch.setattr(Config, "SEARCH_END_POINT", "https://search.test")
+    monkeypatch.setattr(Config, "SEARCH_KEY", "test")
+    monkeypatch.setattr(Config, "SEARCH_INDEX_BUDGET_SECS", budget)
+    monkeypatch.setattr(upstreams._transports["search"], "pool", httpx.MockTransport(handler))
+
+    start = time.monotonic()
+    documents = asyncio.run(search_indexes(["healthy", "slow", "failing", "malformed"], "onboarding"))
+    elapsed = time.monotonic() - start
+
+    assert [(d["index"], d["title"], d["score"]) for d in documents] == [("healthy", "Handbook", 3.1)]
+    assert elapsed < budget * 2
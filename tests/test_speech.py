@@ -0,0 +1,47 @@
+from utils.speech import SentenceSplitter
+
+
+def _feed_all(splitter: SentenceSplitter, tokens: list) -> list:
+    sentences = []
+    for token in tokens:
+        sentences.extend(splitter.feed(token))
+    tail = splitter.flush()
+    return sentences + ([tail] if tail else [])
+
+
+def test_sentences_are_emitted_as_they_complete():
+    splitter = SentenceSplitter(min_chars=5)
+    assert splitter.feed("The first sentence") == []
+    assert splitter.feed(" ends here. The sec") == ["The first sentence ends here."]
+    assert splitter.feed("ond is unfinished") == []
+    assert splitter.flush() == "The second is unfinished"
+    assert splitter.flush() == ""
+
+
+def test_decimal_point_is_not_a_sentence_end():
+    splitter = SentenceSplitter(min_chars=5)
+    assert _feed_all(splitter, ["Pi is 3.", "14 roughly. Done now."]) == ["Pi is 3.14 roughly.", "Done now."]
+
+
+def test_short_fragments_merge_into_the_next_sentence():
+    splitter = SentenceSplitter(min_chars=10)
+    assert _feed_all(splitter, ["Hi. ", "How are you today? "]) == ["Hi. How are you today?"]
+
+
+def test_line_breaks_end_sentences():
+    splitter = SentenceSplitter(min_chars=5)
+    assert _feed_all(splitter, ["- First item\n", "- Second item\n"]) == ["- First item", "- Second item"]
+
+
+def test_closing_quotes_stay_with_their_sentence():
+    splitter = SentenceSplitter(min_chars=5)
+    assert _feed_all(splitter, ['He said "stop now." Then left.']) == ['He said "stop now."', "Then left."]
+
+
+def test_citations_and_extra_whitespace_are_removed():
+    splitter = SentenceSplitter(min_chars=5)
+    assert _feed_all(splitter, ["Onboarding  takes\ntwo weeks. ", "Laptops [doc2] arrive [doc1]"]) == [
+        "Onboarding takes",
+        "two weeks.",
+        "Laptops arrive",
+    ]
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from utils import deadline
+from utils.token_budget import TokenBudget, complete_with_continuation, token_budget
+
+
+def _budget(**overrides) -> TokenBudget:
+    settings = {"window": 10, "percentile": 0.9, "margin": 0.25, "floor": 100, "min_samples": 3}
+    settings.update(overrides)
+    return TokenBudget(**settings)
+
+
+def test_sized_waits_for_enough_samples():
+    budget = _budget()
+    budget.record(("k",), 400, 0, False)
+    budget.record(("k",), 400, 0, False)
+    assert budget._sized(("k",)) is None
+    assert budget.max_tokens(("k",), 1000) == 1000
+
+
+def test_sized_is_high_percentile_plus_margin():
+    budget = _budget()
+    for tokens in (100, 200, 300, 400, 500, 600, 700, 800, 900, 1000):
+        budget.record(("k",), tokens, 0, False)
+    # 90th percentile of the window is 1000, plus 25%
+    assert budget._sized(("k",)) == 1250
+    assert budget.max_tokens(("k",), 1000) == 1000
+
+
+def test_sized_respects_floor_and_window():
+    budget = _budget(window=3)
+    for tokens in (2000, 10, 20, 30):
+        budget.record(("k",), tokens, 0, False)
+    # 2000 has left the window; 30 * 1.25 is below the floor
+    assert budget._sized(("k",)) == 100
+
+
+def test_continuations_are_charged_against_reclaimed_tokens(make_completion):
+    key = ("test-reclaimed", "model", None)
+    for _ in range(token_budget.min_samples):
+        token_budget.record(key, 200, 0, False)
+    reclaimed_before = token_budget.stats()["test-reclaimed/model"]["reclaimed_tokens"]
+    replies = [
+        make_completion("first", "length", prompt_tokens=100, completion_tokens=250),
+        make_completion(" second", "stop", prompt_tokens=400, completion_tokens=150),
+    ]
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return replies[len(calls) - 1]
+
+    asyncio.run(complete_with_continuation(create, key, 1000, [{"role": "user", "content": "hi"}], model="test"))
+
+    first_reservation = calls[0]["max_tokens"]
+    assert calls[1]["max_tokens"] == 1000 - 250
+    reclaimed = token_budget.stats()["test-reclaimed/model"]["reclaimed_tokens"] - reclaimed_before
+    # Saved on the first call, minus the continuation's reservation and its re-sent prompt
+    assert reclaimed == (1000 - first_reservation) - (1000 - 250) - 400
+
+
+def test_each_call_gets_the_remaining_deadline(make_completion):
+    replies = [
+        make_completion("first", "length", prompt_tokens=10),
+        make_completion(" second", "stop", prompt_tokens=10),
+    ]
+    timeouts = []
+
+    async def create(**kwargs):
+        timeouts.append(kwargs["timeout"])
+        await asyncio.sleep(0.2)
+        return replies[len(timeouts) - 1]
+
+    async def run():
+        token = deadline._deadline.set(time.monotonic() + 5.0)
+        try:
+            await complete_with_continuation(
+                create, ("test-timeout", "model", None), 1000, [{"role": "user", "content": "hi"}],
+                default_timeout=120.0, model="test"
+            )
+        finally:
+            deadline._deadline.reset(token)
+
+    asyncio.run(run())
+    assert timeouts[0] <= 5.0
+    assert timeouts[1] < timeouts[0] - 0.15
@@ -0,0 +1,30 @@
+from utils.traffic_capture import sanitize
+
+
+def test_secrets_are_dropped_case_insensitively():
+    body = {"question": "hi", "API-Key": "secret", "token": "t", "nested": {"Authorization": "Bearer x", "n": 1}}
+    assert sanitize(body) == {"question": "hi", "nested": {"n": 1}}
+
+
+def test_user_text_is_replaced_with_filler_of_the_same_length():
+    body = {"messages": [{"role": "user", "content": "What is the leave policy?"}], "temperature": 0.2}
+    sanitized = sanitize(body)
+    message = sanitized["messages"][0]
+    assert message["role"] == "user"
+    assert message["content"] != "What is the leave policy?"
+    assert len(message["content"]) == len("What is the leave policy?")
+    assert sanitized["temperature"] == 0.2
+
+
+def test_long_strings_are_redacted_anywhere():
+    long_text = "x" * 65
+    sanitized = sanitize({"model": "gpt-4o", "notes": long_text, "ids": [long_text, "short"]})
+    assert sanitized["model"] == "gpt-4o"
+    assert len(sanitized["notes"]) == 65 and "x" not in sanitized["notes"]
+    assert sanitized["ids"][1] == "short"
+    assert len(sanitized["ids"][0]) == 65 and sanitized["ids"][0] != long_text
+
+
+def test_non_string_values_are_kept():
+    body = {"text": [1, None, True, {"k": 2.5}]}
+    assert sanitize(body) == body
@@ -0,0 +1,280 @@
+"""
+Benchmark the production serving profile (gunicorn.conf.py) against the
+default single-process launch, in requests/sec per core.
+
+Both launches serve the real app with every upstream pointed at the stub
+from tools/replay_traffic.py, so the numbers measure our serving overhead
+(HTTP parsing, event loop, JSON, the OpenAI client) rather than Azure:
+
+  python tools/bench_serving.py --duration 20 --concurrency 64
+
+Profiles:
+  default  uvicorn main:app, one process on the asyncio loop
+  tuned    gunicorn -c gunicorn.conf.py (CPU-sized workers, uvloop, httptools)
+
+"per core" divides throughput by the cores the launch may use (1 for the
+default launch, the worker count for the tuned one); "per cpu-second"
+divides it by the CPU time the server processes actually consumed, which
+stays comparable on a machine shared with the load generator. Run the load
+generator on more cores than the server for meaningful numbers.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAT_BODY = {
+    "messages": [{"role": "user", "content": "Summarize the onboarding checklist in three bullet points."}],
+    "currentModel": "LottieAI",
+    "aiModel": {"deploymentName": "gpt-4o-mini"},
+    "searchLibrary": "jennie-v1",
+}
+
+WORKLOADS = {
+    "chat": ("POST", "/getChatCompletion", CHAT_BODY),
+    "live": ("GET", "/health/live", None),
+}
+
+
+def _available_cpus() -> int:
+    spec = importlib.util.spec_from_file_location("gunicorn_profile", os.path.join(ROOT, "gunicorn.conf.py"))
+    profile = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(profile)
+    return profile.available_cpus()
+
+
+def _percentile(values: list, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 1)
+
+
+# --- Server processes ------------------------------------------------------
+
+def _stub_capture(path: str, latency_ms: float):
+    """A one-record capture so the stub answers every upstream after `latency_ms`"""
+    calls = [
+        {"method": "POST", "path": "/openai/deployments/x/chat/completions", "latency_ms": latency_ms,
+         "response_bytes": 1200, "status": 200},
+        {"method": "POST", "path": "/indexes/x/docs/search", "latency_ms": latency_ms, "status": 200},
+        {"method": "POST", "path": "/openai/deployments/x/embeddings", "latency_ms": latency_ms, "status": 200},
+        {"method": "HEAD", "path": "/", "latency_ms": latency_ms, "status": 200},
+    ]
+    with open(path, "w") as f:
+        f.write(json.dumps({"ts": 0, "method": "POST", "path": "/getChatCompletion", "upstream_calls": calls}) + "\n")
+
+
+def _server_env(stub_port: int, port: int, workers: int) -> dict:
+    stub = f"http://127.0.0.1:{stub_port}"
+    env = dict(os.environ)
+    env.update({
+        "ENDPOINT_URL": stub,
+        "AZURE_OPENAI_API_KEY": "stub",
+        "jennie_search_endpoint": stub,
+        "jennie_api_url_3.5_turbo_16k": f"{stub}/openai/deployments/title/chat/completions",
+        "BLOB_ENDPOINT_URL": f"{stub}/blob",
+        "SPEECH_KEY": env.get("SPEECH_KEY", "stub"),
+        "SPEECH_REGION": env.get("SPEECH_REGION", "westus"),
+        "AZURE_STORAGE_ACCOUNT_NAME": env.get("AZURE_STORAGE_ACCOUNT_NAME", "stub"),
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "TRAFFIC_CAPTURE_PATH": "",
+    })
+    return env
+
+
+def _launch_command(profile: str, port: int) -> list:
+    if profile == "default":
+        # uvloop was not installed before this profile, so the stock launch ran on asyncio
+        return [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                "--loop", "asyncio"]
+    return [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+
+
+def _wait_until_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def _process_tree(root_pid: int) -> list:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def _cpu_seconds(root_pid: int) -> float:
+    """User + system CPU time of a process and all of its live descendants (Linux only)"""
+    ticks = os.sysconf("SC_CLK_TCK")
+    total = 0
+    for pid in _process_tree(root_pid):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / ticks
+
+
+# --- Load generation -------------------------------------------------------
+
+def _load_worker(target: str, workload: str, concurrency: int, duration: float, results):
+    method, path, body = WORKLOADS[workload]
+
+    async def run():
+        latencies, errors = [], 0
+        stop_at = time.monotonic() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=target, timeout=30.0, limits=limits) as client:
+            async def user():
+                nonlocal errors
+                while time.monotonic() < stop_at:
+                    sent = time.monotonic()
+                    try:
+                        response = await client.request(method, path, json=body)
+                        ok = response.status_code < 400
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies.append((time.monotonic() - sent) * 1000)
+                    else:
+                        errors += 1
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+        return latencies, errors
+
+    results.put(asyncio.run(run()))
+
+
+def generate_load(target: str, workload: str, concurrency: int, duration: float, processes: int) -> dict:
+    results = multiprocessing.Queue()
+    per_process = max(1, concurrency // processes)
+    workers = [
+        multiprocessing.Process(target=_load_worker, args=(target, workload, per_process, duration, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    latencies, errors = [], 0
+    for _ in workers:
+        worker_latencies, worker_errors = results.get()
+        latencies.extend(worker_latencies)
+        errors += worker_errors
+    for worker in workers:
+        worker.join()
+    return {"requests": len(latencies), "errors": errors, "latencies": latencies}
+
+
+# --- Benchmark -------------------------------------------------------------
+
+def bench_profile(profile: str, args, cores: int) -> dict:
+    port = args.port + (0 if profile == "default" else 1)
+    workers = 1 if profile == "default" else cores
+    server = subprocess.Popen(
+        _launch_command(profile, port), cwd=ROOT, env=_server_env(args.stub_port, port, workers),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    target = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(f"{target}/health/ready")
+        # Let every worker open its pools before measuring
+        generate_load(target, args.workload, args.concurrency, args.warmup, args.load_processes)
+        cpu_before = _cpu_seconds(server.pid)
+        start = time.monotonic()
+        load = generate_load(target, args.workload, args.concurrency, args.duration, args.load_processes)
+        wall = time.monotonic() - start
+        cpu_used = _cpu_seconds(server.pid) - cpu_before
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=30)
+
+    rps = load["requests"] / wall
+    return {
+        "profile": profile,
+        "workers": workers,
+        "requests": load["requests"],
+        "errors": load["errors"],
+        "rps": round(rps, 1),
+        "rps_per_core": round(rps / workers, 1),
+        "server_cpu_seconds": round(cpu_used, 2),
+        "rps_per_cpu_second": round(load["requests"] / cpu_used, 1) if cpu_used else None,
+        "p50_ms": _percentile(load["latencies"], 50),
+        "p99_ms": _percentile(load["latencies"], 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="default,tuned")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="chat")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--load-processes", type=int, default=2)
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, help="tuned profile worker count (default: available CPUs)")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    cores = args.workers or _available_cpus()
+    capture = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False)
+    capture.close()
+    _stub_capture(capture.name, args.upstream_latency_ms)
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "tools", "replay_traffic.py"), "stub",
+         "--capture", capture.name, "--port", str(args.stub_port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_until_ready(f"http://127.0.0.1:{args.stub_port}/")
+        results = [bench_profile(profile, args, cores) for profile in args.profiles.split(",")]
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+        os.unlink(capture.name)
+
+    columns = ("profile", "workers", "rps", "rps_per_core", "rps_per_cpu_second", "p50_ms", "p99_ms", "errors")
+    print("".join(f"{column:>20}" for column in columns))
+    for result in results:
+        print("".join(f"{str(result[column]):>20}" for column in columns))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cores": cores, "workload": args.workload, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
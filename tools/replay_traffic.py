@@ -0,0 +1,324 @@
+"""
+Replay captured production traffic for performance regression testing.
+
+Traffic is captured by utils/traffic_capture.py (set TRAFFIC_CAPTURE_PATH).
+Typical run, comparing two builds against the same recorded traffic:
+
+  # 1. Upstream stub that reproduces the recorded upstream latencies
+  python tools/replay_traffic.py stub --capture traffic.jsonl --port 9100
+
+  # 2. Build under test, pointed at the stub
+  env ENDPOINT_URL=http://127.0.0.1:9100 AZURE_OPENAI_API_KEY=stub \\
+      jennie_search_endpoint=http://127.0.0.1:9100 \\
+      jennie_api_url_3.5_turbo_16k=http://127.0.0.1:9100/openai/deployments/title/chat/completions \\
+      BLOB_ENDPOINT_URL=http://127.0.0.1:9100/blob \\
+      uvicorn main:app --port 8000
+
+  # 3. Replay at recorded pace (or --speed 4 for 4x), once per build
+  python tools/replay_traffic.py run --capture traffic.jsonl --target http://127.0.0.1:8000 --output a.json
+  python tools/replay_traffic.py run --capture traffic.jsonl --target http://127.0.0.1:8001 --output b.json
+
+  # 4. Latency / throughput diff
+  python tools/replay_traffic.py compare a.json b.json
+
+Speech synthesis goes through the Azure Speech SDK rather than HTTP, so the
+stub cannot intercept it: replaying /text-to-speech or /chat-to-speech still
+calls the configured speech region.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+_FILLER = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+# Bytes of JSON envelope around the message content in a chat completion
+_COMPLETION_ENVELOPE_BYTES = 300
+
+
+def load_capture(path: str) -> list:
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["ts"])
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 1)
+
+
+def _filler(length: int) -> str:
+    return (_FILLER * (length // len(_FILLER) + 1))[:length]
+
+
+# --- Upstream stub ---------------------------------------------------------
+
+def _upstream_kind(method: str, path: str) -> str:
+    if path.endswith("/chat/completions"):
+        return "chat"
+    if path.endswith("/embeddings"):
+        return "embeddings"
+    if path.endswith("/docs/search"):
+        return "search"
+    if "get_signed_url" in path:
+        return "elevenlabs"
+    return "blob"
+
+
+def build_stub(records: list):
+    """
+    ASGI app answering every upstream the service calls. Recorded calls of
+    each kind are replayed in capture order (cycling when exhausted), so a
+    given replay sees the same latency sequence every time.
+    """
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response, StreamingResponse
+    from starlette.routing import Route
+
+    recorded = defaultdict(list)
+    for record in records:
+        for call in record.get("upstream_calls") or []:
+            if "path" in call:
+                recorded[_upstream_kind(call["method"], call["path"])].append(call)
+    sequences = {kind: itertools.cycle(calls) for kind, calls in recorded.items()}
+
+    def next_call(kind: str) -> dict:
+        if kind in sequences:
+            return next(sequences[kind])
+        return {"latency_ms": 50.0, "response_bytes": 0, "status": 200}
+
+    async def handle(request: Request):
+        kind = _upstream_kind(request.method, request.url.path)
+        call = next_call(kind)
+        await asyncio.sleep(call["latency_ms"] / 1000)
+
+        if request.method == "HEAD":
+            return Response(status_code=200, headers={"ETag": '"stub"'})
+        if kind == "chat":
+            body = await request.json()
+            size = max(call.get("response_bytes", 0) - _COMPLETION_ENVELOPE_BYTES, 400)
+            if body.get("stream"):
+                return StreamingResponse(_completion_events(_filler(size)), media_type="text/event-stream")
+            return JSONResponse(_completion(_filler(size)))
+        if kind == "embeddings":
+            return JSONResponse({
+                "object": "list",
+                "model": "stub",
+                "data": [{"object": "embedding", "index": 0, "embedding": [0.0] * 1536}],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        if kind == "search":
+            top = (await request.json()).get("top", 5)
+            return JSONResponse({"value": [_search_document(i) for i in range(top)]})
+        if kind == "elevenlabs":
+            return JSONResponse({"signed_url": "wss://stub.invalid/convai"})
+        size = call.get("response_bytes", 0) or 1024
+        return Response(b"\0" * size, media_type="application/octet-stream", headers={"ETag": '"stub"'})
+
+    return Starlette(routes=[Route("/{path:path}", handle, methods=["GET", "HEAD", "POST"])])
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 4},
+    }
+
+
+async def _completion_events(content: str):
+    for start in range(0, len(content), 16):
+        chunk = {
+            "id": "stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{"index": 0, "delta": {"content": content[start:start + 16]}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def _search_document(rank: int) -> dict:
+    text = _filler(1200)
+    return {
+        "@search.score": 10.0 - rank,
+        "@search.rerankerScore": 3.0 - rank * 0.1,
+        "content": text,
+        "title": f"Document {rank}",
+        "sub_title": f"Document {rank}",
+        "filepath": f"doc-{rank}.pdf",
+        "file_name": f"doc-{rank}.pdf",
+        "url": f"https://stub.invalid/doc-{rank}.pdf",
+        "file_url": f"https://stub.invalid/doc-{rank}.pdf",
+    }
+
+
+# --- Replay ----------------------------------------------------------------
+
+async def replay(records: list, target: str, speed: float, concurrency: int, timeout: float) -> dict:
+    replayable = [record for record in records if not record.get("body_truncated")]
+    results = []
+    slots = asyncio.Semaphore(concurrency)
+    first_ts = replayable[0]["ts"] if replayable else 0
+
+    async with httpx.AsyncClient(
+        base_url=target,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    ) as client:
+        start = time.monotonic()
+
+        async def fire(record: dict):
+            delay = (record["ts"] - first_ts) / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with slots:
+                sent = time.monotonic()
+                ttfb = None
+                status = None
+                try:
+                    async with client.stream(
+                        record["method"],
+                        record["path"] + (f"?{record['query']}" if record.get("query") else ""),
+                        json=record.get("body") if record.get("body") is not None else None,
+                    ) as response:
+                        async for _ in response.aiter_raw():
+                            if ttfb is None:
+                                ttfb = time.monotonic() - sent
+                        status = response.status_code
+                except httpx.HTTPError:
+                    pass
+                results.append({
+                    "path": record["path"],
+                    "status": status,
+                    "latency_ms": (time.monotonic() - sent) * 1000,
+                    "ttfb_ms": ttfb * 1000 if ttfb is not None else None,
+                    "schedule_lag_ms": max(0.0, (sent - start) - (record["ts"] - first_ts) / speed) * 1000,
+                })
+
+        await asyncio.gather(*(fire(record) for record in replayable))
+        wall = time.monotonic() - start
+
+    return _report(results, target, speed, wall, skipped=len(records) - len(replayable))
+
+
+def _summarize(results: list) -> dict:
+    ok = [r for r in results if r["status"] is not None and r["status"] < 500]
+    latencies = [r["latency_ms"] for r in ok]
+    ttfbs = [r["ttfb_ms"] for r in ok if r["ttfb_ms"] is not None]
+    return {
+        "count": len(results),
+        "errors": len(results) - len(ok),
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "ttfb_p50_ms": percentile(ttfbs, 50),
+        "schedule_lag_p99_ms": percentile([r["schedule_lag_ms"] for r in results], 99),
+    }
+
+
+def _report(results: list, target: str, speed: float, wall: float, skipped: int) -> dict:
+    by_path = defaultdict(list)
+    for result in results:
+        by_path[result["path"]].append(result)
+    return {
+        "target": target,
+        "speed": speed,
+        "requests": len(results),
+        "skipped": skipped,
+        "wall_seconds": round(wall, 2),
+        "throughput_rps": round(len(results) / wall, 2) if wall else None,
+        "overall": _summarize(results),
+        "routes": {path: _summarize(items) for path, items in sorted(by_path.items())},
+    }
+
+
+# --- Compare ---------------------------------------------------------------
+
+def _delta(before, after) -> str:
+    if before is None or after is None:
+        return "n/a"
+    if before == 0:
+        return "+inf%" if after else "0.0%"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before: dict, after: dict) -> str:
+    metrics = ("p50_ms", "p90_ms", "p99_ms", "ttfb_p50_ms", "errors")
+    lines = [
+        f"throughput_rps: {before['throughput_rps']} -> {after['throughput_rps']} "
+        f"({_delta(before['throughput_rps'], after['throughput_rps'])})",
+        "",
+        f"{'route':<28}{'metric':<14}{'before':>10}{'after':>10}{'delta':>10}",
+    ]
+    routes = {"(overall)": (before["overall"], after["overall"])}
+    for path in sorted(set(before["routes"]) | set(after["routes"])):
+        routes[path] = (before["routes"].get(path, {}), after["routes"].get(path, {}))
+    for path, (a, b) in routes.items():
+        for metric in metrics:
+            lines.append(
+                f"{path:<28}{metric:<14}{str(a.get(metric)):>10}{str(b.get(metric)):>10}"
+                f"{_delta(a.get(metric), b.get(metric)):>10}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stub = commands.add_parser("stub", help="serve upstream stubs with recorded latencies")
+    stub.add_argument("--capture", required=True)
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=9100)
+
+    run = commands.add_parser("run", help="replay captured traffic against a build")
+    run.add_argument("--capture", required=True)
+    run.add_argument("--target", required=True)
+    run.add_argument("--speed", type=float, default=1.0, help="rate multiplier over the recorded pace")
+    run.add_argument("--concurrency", type=int, default=100)
+    run.add_argument("--timeout", type=float, default=120.0)
+    run.add_argument("--output", help="write the JSON report here")
+
+    diff = commands.add_parser("compare", help="diff two replay reports")
+    diff.add_argument("before")
+    diff.add_argument("after")
+
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        import uvicorn
+        uvicorn.run(build_stub(load_capture(args.capture)), host=args.host, port=args.port, log_level="warning")
+    elif args.command == "run":
+        report = asyncio.run(replay(load_capture(args.capture), args.target, args.speed, args.concurrency, args.timeout))
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output)
+        print(output)
+    else:
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        print(compare(before, after))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# utils/blob_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedBlob:
+    key: str
+    etag: str
+    content_type: str
+    size: int
+    validated_at: float
+
+
+class BlobDiskCache:
+    """
+    Size-bounded LRU cache of whole blobs on local disk.
+
+    Each blob is stored as `<key>.blob` with a `<key>.json` sidecar holding
+    its ETag and content type. The LRU order lives in memory and is rebuilt
+    from file access times on startup, so a restarted worker keeps its warm
+    cache. Every method except `stats` touches the disk, so async callers run
+    them in a worker thread; a lock keeps the index consistent.
+
+    Several worker processes share one directory, and a recycled worker's
+    blobs are in no live index, so the bound is also enforced against the
+    directory's actual total: hits refresh a blob's access time, and eviction
+    removes the least recently used files whichever worker cached them.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_object_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self._entries: "OrderedDict[str, CachedBlob]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key_for(container_name: str, blob_name: str) -> str:
+        return hashlib.sha256(f"{container_name}/{blob_name}".encode()).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.blob")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                # Left behind by a download that never finished
+                os.remove(os.path.join(self.directory, name))
+                continue
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            try:
+                with open(self._meta_path(key)) as f:
+                    entry = CachedBlob(**json.load(f))
+                atime = os.stat(self.path_for(key)).st_atime
+            except (OSError, ValueError, TypeError):
+                self._remove_files(key)
+                continue
+            found.append((atime, entry))
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[entry.key] = entry
+            self._size += entry.size
+        self._evict()
+        logger.info(f"Blob cache loaded {len(self._entries)} blobs ({self._size} bytes) from {self.directory}")
+
+    def get(self, key: str) -> Optional[CachedBlob]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._touch(key):
+                # Evicted by another worker sharing the directory
+                self._entries.pop(key)
+                self._size -= entry.size
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def new_temp_path(self) -> str:
+        return os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+
+    def commit(self, key: str, temp_path: str, etag: str, content_type: str) -> Optional[CachedBlob]:
+        """Move a fully downloaded temp file into the cache"""
+        size = os.path.getsize(temp_path)
+        if size > self.max_object_bytes or size > self.max_bytes:
+            os.remove(temp_path)
+            return None
+        entry = CachedBlob(key=key, etag=etag, content_type=content_type, size=size, validated_at=time.time())
+        with self._lock:
+            os.replace(temp_path, self.path_for(key))
+            self._touch(key)
+            self._write_meta(entry)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += size
+            self._evict()
+        return entry
+
+    def mark_validated(self, entry: CachedBlob):
+        """Record that upstream confirmed the cached copy is still current"""
+        with self._lock:
+            entry.validated_at = time.time()
+            self._write_meta(entry)
+
+    def discard(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+            self._remove_files(key)
+
+    def stats(self) -> dict:
+        return {
+            "blobs": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _write_meta(self, entry: CachedBlob):
+        with open(self._meta_path(entry.key), "w") as f:
+            json.dump(asdict(entry), f)
+
+    def _touch(self, key: str) -> bool:
+        """Mark a blob as just used for the other workers' eviction; False if it is gone"""
+        try:
+            os.utime(self.path_for(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+            self._remove_files(key)
+
+        on_disk = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not item.name.endswith(".blob"):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                on_disk.append((stat.st_atime, item.name[:-len(".blob")], stat.st_size))
+        total = sum(size for _, _, size in on_disk)
+        for _, key, size in sorted(on_disk):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+            self._remove_files(key)
+            total -= size
+
+    def _remove_files(self, key: str):
+        for path in (self.path_for(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
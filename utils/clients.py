@@ -1,17 +1,267 @@
 # utils/clients.py
 
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import httpx
 from openai import AsyncAzureOpenAI
- 
+
 import azure.cognitiveservices.speech as speechsdk
 from .helpers import get_speech_config
+from .traffic_capture import upstream_event_hooks
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Per-upstream pool sizing and timeouts. `warm_url` is only used to open
+# connections (DNS + TCP + TLS) ahead of real traffic; any HTTP status counts
+# as success. Azure Storage does not speak HTTP/2, so it stays on HTTP/1.1.
+UPSTREAMS = {
+    "openai": {
+        "warm_url": Config.ENDPOINT,
+        "max_connections": 100,
+        "max_keepalive": 20,
+        "timeout": httpx.Timeout(120.0, connect=5.0),
+        "http2": True,
+    },
+    "reference": {
+        "warm_url": Config.REFERENCE_COMPLETION_API_URL,
+        "max_connections": 20,
+        "max_keepalive": 5,
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "http2": True,
+    },
+    "search": {
+        "warm_url": Config.SEARCH_END_POINT,
+        "max_connections": 50,
+        "max_keepalive": 10,
+        "timeout": httpx.Timeout(10.0, connect=3.0),
+        "http2": True,
+    },
+    "blob": {
+        "warm_url": Config.BLOB_ENDPOINT_URL if Config.BLOB_PROXY_ENABLED else None,
+        "max_connections": 50,
+        "max_keepalive": 10,
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "http2": False,
+    },
+    "elevenlabs": {
+        "warm_url": "https://api.elevenlabs.io" if Config.XI_API_KEY else None,
+        "max_connections": 10,
+        "max_keepalive": 2,
+        "timeout": httpx.Timeout(10.0, connect=3.0),
+        "http2": True,
+    },
+}
+
+
+class _PoolTransport(httpx.AsyncBaseTransport):
+    """
+    Transport whose connection pool can be swapped out underneath the client.
+
+    With a preloaded app the clients are created in the gunicorn master and
+    inherited by every worker; `reset()` gives a forked worker a pool of its
+    own without touching the (shared) sockets of the inherited one.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self.pool = factory()
+
+    def reset(self):
+        self.pool = self._factory()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.pool.handle_async_request(request)
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+class UpstreamClients:
+    """
+    Registry of pooled HTTP clients, one per upstream service.
+
+    Clients are created at import so modules can bind them directly, but no
+    connection is opened until `start()` runs in the app lifespan (i.e. in
+    each worker process). `start()` pre-warms every pool and then keeps it
+    warm by re-touching any upstream that has been idle for close to the
+    keep-alive expiry.
+    """
+
+    def __init__(self, upstreams: dict):
+        self._specs = upstreams
+        self._transports = {}
+        self._clients = {}
+        self._last_used = {}
+        self._warmed = {}
+        self._requests = {}
+        self._rewarm_task: Optional[asyncio.Task] = None
+        self.started = False
+        for name in upstreams:
+            self._create(name)
+
+    def _create(self, name: str):
+        spec = self._specs[name]
+        transport = _PoolTransport(lambda: httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=spec["max_connections"],
+                max_keepalive_connections=spec["max_keepalive"],
+                keepalive_expiry=Config.UPSTREAM_KEEPALIVE_SECS,
+            ),
+            http2=spec["http2"] and HTTP2_AVAILABLE,
+        ))
+
+        async def on_request(request: httpx.Request):
+            self._last_used[name] = time.monotonic()
+            self._requests[name] += 1
+
+        hooks = upstream_event_hooks(name)
+        hooks["request"].insert(0, on_request)
+        self._transports[name] = transport
+        self._clients[name] = httpx.AsyncClient(
+            transport=transport,
+            timeout=spec["timeout"],
+            event_hooks=hooks,
+        )
+        self._last_used[name] = 0.0
+        self._warmed[name] = False
+        self._requests[name] = 0
+
+    def http(self, name: str) -> httpx.AsyncClient:
+        return self._clients[name]
+
+    def reset_after_fork(self):
+        """Drop any pool state inherited from the parent process (gunicorn post_fork)"""
+        for name, transport in self._transports.items():
+            transport.reset()
+            self._last_used[name] = 0.0
+            self._warmed[name] = False
+            self._requests[name] = 0
+        self.started = False
+
+    async def start(self):
+        await self.warm()
+        self._rewarm_task = asyncio.create_task(self._keep_warm())
+        self.started = True
+
+    async def close(self):
+        self.started = False
+        if self._rewarm_task is not None:
+            self._rewarm_task.cancel()
+            self._rewarm_task = None
+        await asyncio.gather(*(client.aclose() for client in self._clients.values()), return_exceptions=True)
+
+    async def warm(self, names: Optional[list] = None):
+        """Open connections to each upstream concurrently; failures are logged, never raised"""
+        names = names or [name for name, spec in self._specs.items() if spec["warm_url"]]
+        start = time.monotonic()
+        await asyncio.gather(*(self._warm_one(name) for name in names))
+        logger.info(f"Pre-warmed upstreams {names} in {time.monotonic() - start:.2f} seconds")
+
+    async def _warm_one(self, name: str):
+        spec = self._specs[name]
+        client = self._clients[name]
+        # HTTP/2 multiplexes over one connection; HTTP/1.1 needs one per
+        # concurrent request
+        count = 1 if spec["http2"] and HTTP2_AVAILABLE else min(Config.UPSTREAM_PREWARM_CONNECTIONS, spec["max_keepalive"])
+        results = await asyncio.gather(
+            *(client.head(spec["warm_url"], timeout=5.0) for _ in range(count)),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.warning(f"Pre-warming {name} failed: {errors[0]!r}")
+        self._warmed[name] = len(errors) < len(results)
+
+    async def _keep_warm(self):
+        threshold = Config.UPSTREAM_KEEPALIVE_SECS * 0.8
+        while True:
+            await asyncio.sleep(threshold / 2)
+            now = time.monotonic()
+            idle = [
+                name for name, spec in self._specs.items()
+                if spec["warm_url"] and now - self._last_used[name] > threshold
+            ]
+            if idle:
+                try:
+                    await self.warm(idle)
+                except Exception as e:
+                    logger.warning(f"Re-warming upstreams failed: {e}")
+
+    def stats(self) -> dict:
+        """Pool utilization per upstream"""
+        now = time.monotonic()
+        stats = {}
+        for name, spec in self._specs.items():
+            # httpcore exposes no public pool counters, so read its state defensively
+            pool = getattr(self._transports[name].pool, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            pending = list(getattr(pool, "_requests", []))
+            active = sum(1 for request in pending if getattr(request, "connection", None) is not None)
+            stats[name] = {
+                "http2": spec["http2"] and HTTP2_AVAILABLE,
+                "warmed": self._warmed[name],
+                "max_connections": spec["max_connections"],
+                "connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle()),
+                "active_requests": active,
+                "queued_requests": len(pending) - active,
+                "utilization": round(len(connections) / spec["max_connections"], 3),
+                "requests_total": self._requests[name],
+                "idle_seconds": round(now - self._last_used[name], 1) if self._last_used[name] else None,
+            }
+        return stats
+
+    def health(self) -> dict:
+        """
+        Whether this worker's clients can take traffic.
+
+        A closed client or a pool with requests queued behind
+        `max_connections` makes the worker unready. Upstreams that failed to
+        pre-warm are only reported: failing readiness on an upstream outage
+        would take every instance out of rotation at once.
+        """
+        pools = {}
+        for name, pool in self.stats().items():
+            pools[name] = {
+                "open": not self._clients[name].is_closed,
+                "warmed": pool["warmed"],
+                "saturated": pool["queued_requests"] > 0,
+                "utilization": pool["utilization"],
+            }
+        return {
+            "started": self.started,
+            "ready": self.started and all(p["open"] and not p["saturated"] for p in pools.values()),
+            "pools": pools,
+        }
+
+
+upstreams = UpstreamClients(UPSTREAMS)
+
 # Initialize Azure OpenAI client
 client = AsyncAzureOpenAI(
     azure_endpoint=Config.ENDPOINT,
     api_key=Config.SUBSCRIPTION_KEY,
     api_version=Config.API_VERSION,
+    http_client=upstreams.http("openai"),
+    timeout=UPSTREAMS["openai"]["timeout"],
 )
 
 # Initialize Speech SDK client
 speech_config = get_speech_config()
+
+# Separate config for streamed synthesis: MP3 frames can be concatenated
+# sentence by sentence, WAV files cannot
+streaming_speech_config = get_speech_config()
+streaming_speech_config.set_speech_synthesis_output_format(
+    speechsdk.SpeechSynthesisOutputFormat.Audio24Khz48KBitRateMonoMp3
+)
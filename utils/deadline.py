@@ -0,0 +1,180 @@
+# utils/deadline.py
+
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-request-deadline-ms"
+
+# Overall time budget per route, in seconds. A client may ask for less via the
+# X-Request-Deadline-Ms header, never for more. None means no deadline (the
+# request is still cancelled if the client goes away).
+ROUTE_DEADLINES = {
+    "/getChatCompletion": 60.0,
+    "/chat-to-speech": 120.0,
+    "/text-to-speech": 30.0,
+    "/getReference": 90.0,
+    "/getReferenceStream": 120.0,
+    "/generateTitle": 15.0,
+    "/api/signed-url": 10.0,
+    "/proxy-blob": None,
+    "/admin/profile": 90.0,
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# Work abandoned because the client left or the budget ran out, per route
+abandoned = defaultdict(lambda: {"disconnected": 0, "deadline_exceeded": 0, "abandoned_seconds": 0.0})
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None if it has no deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def bounded_timeout(default: float) -> float:
+    """Clamp an upstream timeout so a single call cannot outlive the request"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+def stop_when_deadline_near(retry_state) -> bool:
+    """tenacity stop condition: don't start another attempt without at least a second left"""
+    left = remaining()
+    return left is not None and left < 1.0
+
+
+def _budget_for(scope) -> Optional[float]:
+    budget = ROUTE_DEADLINES.get(scope["path"], Config.REQUEST_DEADLINE_SECS)
+    for name, value in scope.get("headers", []):
+        if name == DEADLINE_HEADER:
+            try:
+                requested = int(value) / 1000
+            except ValueError:
+                break
+            budget = requested if budget is None else min(budget, requested)
+            break
+    return budget
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that gives every HTTP request a deadline and cancels the
+    handler, including any in-flight upstream call, as soon as the client
+    disconnects or the deadline passes.
+
+    A single reader task owns the server's `receive` so that a disconnect is
+    noticed even while the handler is blocked awaiting an upstream; the handler
+    reads the same messages through a queue.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = _budget_for(scope)
+        start = time.monotonic()
+        token = _deadline.set(start + budget if budget is not None else None)
+
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_complete = asyncio.Event()
+        response_started = False
+
+        async def read_messages():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def queued_receive():
+            return await messages.get()
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Set before sending: the server reports the disconnect as
+                # soon as it has the final body
+                response_complete.set()
+            await send(message)
+
+        reader = asyncio.create_task(read_messages())
+        handler = asyncio.create_task(self.app(scope, queued_receive, tracked_send))
+        watcher = asyncio.create_task(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {handler, watcher},
+                timeout=max(budget, 0) if budget is not None else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if handler in done:
+                handler.result()
+                return
+            if response_complete.is_set():
+                # The client has the whole response, so the disconnect that
+                # follows it is not abandonment: let post-response work
+                # (background tasks) finish
+                await handler
+                return
+
+            reason = "disconnected" if watcher in done else "deadline_exceeded"
+            handler.cancel()
+            await asyncio.gather(handler, return_exceptions=True)
+            elapsed = time.monotonic() - start
+            stats = abandoned[scope["path"]]
+            stats[reason] += 1
+            stats["abandoned_seconds"] += elapsed
+            logger.info(f"Cancelled {scope['path']} after {elapsed:.2f} seconds: {reason}")
+
+            if reason == "deadline_exceeded" and not disconnected.is_set():
+                await self._send_timeout(send, response_started)
+        finally:
+            # Also covers this middleware itself being cancelled
+            for task in (reader, watcher, handler):
+                task.cancel()
+            _deadline.reset(token)
+
+    @staticmethod
+    async def _send_timeout(send, response_started: bool):
+        if response_started:
+            # Streaming response already under way: just end the body
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def stats() -> dict:
+    return {path: dict(values) for path, values in abandoned.items()}
@@ -1,5 +1,6 @@
 # utils/helpers.py
 import os
+import re
 from datetime import datetime, timedelta
 from azure.storage.blob import generate_container_sas, ContainerSasPermissions
 import azure.cognitiveservices.speech as speechsdk
@@ -55,4 +56,85 @@ def generate_container_sas_token(container_name: str, expiration_secs: int = 300
         expiry=datetime.utcnow() + timedelta(seconds=expiration_secs)
     )
 
+# Reference chunking
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])(\s+)")
+# Markdown headings, numbered sections ("2.1 Setup") and ALL-CAPS title lines
+_HEADING = re.compile(r"^(#{1,6}\s|\d+(\.\d+)*[.)]?\s+\S|[A-Z][A-Z0-9 ,&/-]{3,}$)")
+
+def split_reference(text: str, max_chars: int) -> list:
+    """
+    Split a reference into chunks of at most max_chars, cutting on structure:
+    a new section starts a new chunk once the current one is half full,
+    otherwise paragraphs are packed together; only paragraphs that are too
+    long on their own are cut, at line breaks, then sentences, and only a
+    single line longer than max_chars is hard cut.
+    """
+    chunks = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        # A heading stays with the text that follows it, so that text's
+        # first piece is cut to fit in the heading's chunk
+        lone_heading = "\n" not in current and bool(_HEADING.match(current))
+        room = max_chars - len(current) - 2
+        first_max = room if lone_heading and room > 0 else max_chars
+        for piece in _fit_paragraph(paragraph.strip(), max_chars, first_max):
+            starts_section = bool(_HEADING.match(piece))
+            too_big = len(current) + 2 + len(piece) > max_chars
+            if current and (too_big or (starts_section and len(current) >= max_chars // 2)):
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _paragraph_units(paragraph: str, max_chars: int) -> list:
+    """
+    (separator, text) pairs that can be rejoined into the paragraph: whole
+    lines, with lines longer than max_chars broken into sentences
+    """
+    units = []
+    for index, line in enumerate(paragraph.split("\n")):
+        separator = "\n" if index else ""
+        if len(line) <= max_chars:
+            units.append((separator, line))
+            continue
+        parts = _SENTENCE_BREAK.split(line)
+        units.append((separator, parts[0]))
+        units.extend(zip(parts[1::2], parts[2::2]))
+    return units
+
+def _fit_paragraph(paragraph: str, max_chars: int, first_max: int) -> list:
+    """
+    Cut a paragraph into pieces of at most max_chars, the first at most
+    first_max. Each cut drops only the separator it falls on; any two
+    consecutive pieces together exceed the limit, so split_reference never
+    rejoins them.
+    """
+    if len(paragraph) <= first_max:
+        return [paragraph] if paragraph else []
+    pieces = []
+    current = ""
+
+    def limit():
+        return max_chars if pieces else first_max
+
+    for separator, unit in _paragraph_units(paragraph, max_chars):
+        if current and len(current) + len(separator) + len(unit) <= limit():
+            current += separator + unit
+            continue
+        if current:
+            pieces.append(current)
+            current = ""
+        while len(unit) > limit():
+            cut = limit()
+            pieces.append(unit[:cut])
+            unit = unit[cut:]
+        current = unit
+    if current:
+        pieces.append(current)
+    return pieces
+
 # Speech-related endpoints
\ No newline at end of file
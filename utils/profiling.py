@@ -0,0 +1,132 @@
+# utils/profiling.py
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Detect callbacks that block the event loop.
+
+    A coroutine on the loop records a heartbeat every `interval` seconds and a
+    watchdog thread checks it. When the next heartbeat is more than `threshold`
+    overdue, the loop is stuck inside a single callback, so the watchdog logs
+    that thread's current stack: this points at the blocking call itself. Idle
+    cost is one short wakeup per interval on each side.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.max_lag = max(self.max_lag, now - expected)
+            self._beat = now
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            # Measured from when the next heartbeat was due, not from the
+            # last one: the loop is only late once that moment has passed
+            blocked_for = time.monotonic() - (beat + self.interval)
+            # Report each stall once, while it is still happening
+            if blocked_for < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+            logger.warning(
+                f"Event loop blocked for {blocked_for * 1000:.0f} ms (pid {os.getpid()}). "
+                f"Loop thread stack:\n{stack}"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+loop_monitor = LoopLagMonitor(threshold=Config.LOOP_LAG_THRESHOLD_MS / 1000)
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, hz: int) -> str:
+    """
+    Sample every thread's stack `hz` times a second for `seconds` and return
+    the result in collapsed ("folded") format: one `thread;frame;frame count`
+    line per distinct stack, ready for flamegraph.pl or speedscope.
+
+    Blocking: run it in a worker thread, never on the event loop.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        counts = Counter()
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    finally:
+        _profile_lock.release()
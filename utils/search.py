@@ -0,0 +1,119 @@
+# utils/search.py
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from config import Config
+from .clients import upstreams
+from .deadline import DeadlineExceeded, bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+SEARCH_API_VERSION = "2024-07-01"
+
+
+def fields_mapping(index_name: str) -> dict:
+    """Field names for an index: jennie-v1 uses the original schema, the library indexes the newer one"""
+    return {
+        "content_fields_separator": "\n",
+        "content_fields": ["content"],
+        "filepath_field": "filepath" if index_name == "jennie-v1" else "file_name",
+        "title_field": "title" if index_name == "jennie-v1" else "sub_title",
+        "url_field": "url" if index_name == "jennie-v1" else "file_url",
+        "vector_fields": ["contentVector"] if index_name == "jennie-v1" else ["vector"]
+    }
+
+
+def top_n_documents(index_name: str) -> int:
+    return 5 if index_name == "jennie-v1" else 20
+
+
+async def _search_index(index_name: str, query: str, vector: Optional[list], top: int) -> list:
+    mapping = fields_mapping(index_name)
+    body = {
+        "search": query,
+        "queryType": "semantic",
+        "semanticConfiguration": "default",
+        "top": top,
+        "select": ",".join([
+            mapping["content_fields"][0], mapping["title_field"], mapping["filepath_field"], mapping["url_field"]
+        ]),
+    }
+    if vector is not None:
+        body["vectorQueries"] = [{
+            "kind": "vector",
+            "vector": vector,
+            "fields": ",".join(mapping["vector_fields"]),
+            "k": top,
+        }]
+
+    response = await upstreams.http("search").post(
+        f"{Config.SEARCH_END_POINT.rstrip('/')}/indexes/{index_name}/docs/search",
+        params={"api-version": SEARCH_API_VERSION},
+        headers={"api-key": Config.SEARCH_KEY},
+        json=body,
+    )
+    response.raise_for_status()
+    return [
+        {
+            "index": index_name,
+            "content": document.get(mapping["content_fields"][0]) or "",
+            "title": document.get(mapping["title_field"]),
+            "filepath": document.get(mapping["filepath_field"]),
+            "url": document.get(mapping["url_field"]),
+            # The semantic reranker scores on a fixed 0-4 scale, so it is
+            # comparable across indexes where the raw BM25/RRF score is not
+            "score": document.get("@search.rerankerScore") or document.get("@search.score") or 0.0,
+        }
+        for document in response.json().get("value", [])
+    ]
+
+
+async def search_indexes(index_names: list, query: str, vector: Optional[list] = None) -> list:
+    """
+    Query several indexes concurrently, each within its own time budget.
+
+    An index that errors or misses the budget is left out rather than
+    holding up the answer, so the fan-out takes about as long as the slowest
+    index that made it in time.
+    """
+    async def bounded(index_name: str) -> list:
+        start = time.monotonic()
+        try:
+            results = await asyncio.wait_for(
+                _search_index(index_name, query, vector, top_n_documents(index_name)),
+                timeout=bounded_timeout(Config.SEARCH_INDEX_BUDGET_SECS)
+            )
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"Search on {index_name} exceeded its {Config.SEARCH_INDEX_BUDGET_SECS}s budget, skipping")
+            return []
+        except Exception as e:
+            # Transport errors, error statuses and malformed bodies alike: one
+            # bad index must not fail the whole fan-out
+            logger.warning(f"Search on {index_name} failed, skipping: {e!r}")
+            return []
+        logger.info(f"Search on {index_name} took: {time.monotonic() - start:.2f} seconds")
+        return results
+
+    per_index = await asyncio.gather(*(bounded(index_name) for index_name in index_names))
+    return [document for results in per_index for document in results]
+
+
+def merge_results(documents: list, top_n: int = None, max_chars: int = None) -> list:
+    """Rerank documents from all indexes together and trim them to one bounded context"""
+    top_n = top_n or Config.SEARCH_MERGED_TOP_N
+    max_chars = max_chars or Config.SEARCH_CONTEXT_MAX_CHARS
+    merged = []
+    used = 0
+    for document in sorted(documents, key=lambda d: d["score"], reverse=True)[:top_n]:
+        room = max_chars - used
+        if room <= 0:
+            break
+        content = document["content"][:room]
+        merged.append({**document, "content": content})
+        used += len(content)
+    return merged
@@ -0,0 +1,131 @@
+# utils/speech.py
+
+import asyncio
+import logging
+import re
+import time
+from typing import AsyncIterator
+
+from azure.cognitiveservices.speech import SpeechSynthesizer, ResultReason
+from config import Config
+from .clients import streaming_speech_config
+from .traffic_capture import record_upstream_call
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at terminal punctuation (optionally followed by closing
+# quotes/brackets) *and* whitespace, or at a line break. Requiring the
+# whitespace means "3." is not cut before "14" arrives in the next token.
+_SENTENCE_END = re.compile(r"[.!?;:][\"')\]]*\s+|\n+")
+_CITATION = re.compile(r"\[doc\d+\]")
+
+
+class SentenceSplitter:
+    """Incrementally cut a token stream into speakable sentences."""
+
+    def __init__(self, min_chars: int = Config.TTS_MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        """Add streamed text and return any sentences that are now complete"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = _clean(self._buffer[start:match.end()])
+            # Very short fragments ("Hi.", "1.") are merged into the next
+            # sentence so we don't pay a synthesis round trip for each
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """Return whatever text is left once the stream has ended"""
+        tail = _clean(self._buffer)
+        self._buffer = ""
+        return tail
+
+
+def _clean(text: str) -> str:
+    """Strip citation markers and collapse whitespace for speech"""
+    return " ".join(_CITATION.sub("", text).split())
+
+
+def _synthesize_blocking(text: str) -> bytes:
+    synthesizer = SpeechSynthesizer(speech_config=streaming_speech_config, audio_config=None)
+    result = synthesizer.speak_text_async(text).get()
+    if result.reason != ResultReason.SynthesizingAudioCompleted:
+        raise RuntimeError(f"Speech synthesis failed: {result.reason}")
+    return result.audio_data
+
+
+async def synthesize(text: str) -> bytes:
+    """Synthesize text to MP3 without blocking the event loop"""
+    start = time.monotonic()
+    audio_data = await asyncio.to_thread(_synthesize_blocking, text)
+    record_upstream_call(
+        "speech", (time.monotonic() - start) * 1000,
+        text_chars=len(text), response_bytes=len(audio_data)
+    )
+    return audio_data
+
+
+async def stream_speech(tokens: AsyncIterator[str], concurrency: int = Config.TTS_CONCURRENCY) -> AsyncIterator[bytes]:
+    """
+    Turn a stream of chat tokens into a stream of audio chunks.
+
+    Sentences are synthesized concurrently (at most `concurrency` at once)
+    while tokens keep arriving, but audio is always yielded in sentence
+    order. The producer may run at most `2 * concurrency` sentences ahead of
+    the client so a slow reader doesn't buffer the whole answer in memory.
+    """
+    synth_slots = asyncio.Semaphore(concurrency)
+    read_ahead = asyncio.Semaphore(concurrency * 2)
+    pending: asyncio.Queue = asyncio.Queue()
+
+    async def synthesize_bounded(sentence: str) -> bytes:
+        async with synth_slots:
+            return await synthesize(sentence)
+
+    async def schedule(sentence: str):
+        await read_ahead.acquire()
+        pending.put_nowait(asyncio.create_task(synthesize_bounded(sentence)))
+
+    async def produce():
+        splitter = SentenceSplitter()
+        try:
+            async for token in tokens:
+                for sentence in splitter.feed(token):
+                    await schedule(sentence)
+            tail = splitter.flush()
+            if tail:
+                await schedule(tail)
+        except Exception as e:
+            logger.error(f"Chat stream failed while generating speech: {e}")
+        finally:
+            pending.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            task = await pending.get()
+            if task is None:
+                break
+            try:
+                audio_data = await task
+            except Exception as e:
+                # Drop the sentence rather than the whole answer
+                logger.warning(f"Skipping sentence after synthesis error: {e}")
+                continue
+            finally:
+                read_ahead.release()
+            yield audio_data
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
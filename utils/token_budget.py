@@ -0,0 +1,145 @@
+# utils/token_budget.py
+
+import logging
+from collections import defaultdict, deque
+
+from config import Config
+from .deadline import bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat or summarize anything already written."
+
+
+class TokenBudget:
+    """
+    Size `max_tokens` per request from recent completion lengths.
+
+    Azure counts `max_tokens` (not tokens actually generated) against a
+    deployment's TPM limit when admitting a request, so asking for the
+    worst case every time throttles us long before the quota is used. For
+    each (route, model, index) key we keep a window of recent completion
+    lengths and request their high percentile plus a safety margin, capped
+    at the route's old fixed value. Answers that still hit the limit are
+    continued, so sizing down never truncates.
+    """
+
+    def __init__(self, window: int, percentile: float, margin: float, floor: int, min_samples: int):
+        self.percentile = percentile
+        self.margin = margin
+        self.floor = floor
+        self.min_samples = min_samples
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._stats = defaultdict(lambda: {"requests": 0, "reclaimed_tokens": 0, "continuations": 0, "truncated": 0})
+
+    def max_tokens(self, key: tuple, ceiling: int) -> int:
+        sized = self._sized(key)
+        size = ceiling if sized is None else min(ceiling, sized)
+        stats = self._stats[key]
+        stats["requests"] += 1
+        stats["reclaimed_tokens"] += ceiling - size
+        return size
+
+    def record(self, key: tuple, completion_tokens: int, continuations: int, truncated: bool, overhead_tokens: int = 0):
+        """`overhead_tokens`: what continuations reserved and re-sent, which the smaller first request did not save"""
+        self._samples[key].append(completion_tokens)
+        stats = self._stats[key]
+        stats["reclaimed_tokens"] -= overhead_tokens
+        stats["continuations"] += continuations
+        stats["truncated"] += int(truncated)
+
+    def stats(self) -> dict:
+        return {
+            "/".join(str(part) for part in key if part): {
+                **values,
+                "samples": len(self._samples[key]),
+                "next_max_tokens_hint": self._sized(key),
+            }
+            for key, values in self._stats.items()
+        }
+
+    def _sized(self, key: tuple):
+        """High percentile of recent lengths plus margin, or None until there are enough samples"""
+        samples = self._samples[key]
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        observed = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return max(self.floor, int(observed * (1 + self.margin)))
+
+
+token_budget = TokenBudget(
+    window=Config.TOKEN_BUDGET_WINDOW,
+    percentile=Config.TOKEN_BUDGET_PERCENTILE,
+    margin=Config.TOKEN_BUDGET_MARGIN,
+    floor=Config.TOKEN_BUDGET_FLOOR,
+    min_samples=Config.TOKEN_BUDGET_MIN_SAMPLES,
+)
+
+
+def _completion_tokens(response) -> int:
+    if response.usage is not None:
+        return response.usage.completion_tokens
+    return len(response.choices[0].message.content or "") // 4
+
+
+async def complete_with_continuation(create, key: tuple, ceiling: int, messages: list, follow_up=None,
+                                     default_timeout: float = None, **params):
+    """
+    Call `create` (a chat.completions.create) with an adaptive max_tokens. If
+    the answer stops on the length limit, ask the model to continue, until it
+    finishes or the route's original ceiling is spent, and return one merged
+    completion.
+
+    `follow_up`, if given, is called with the first response and returns the
+    (messages, params) to continue with instead of the original ones. With
+    `default_timeout`, each call gets that timeout cut to the request's
+    remaining deadline at the time it is made.
+    """
+    def timed(call_params: dict) -> dict:
+        if default_timeout is None:
+            return call_params
+        return {**call_params, "timeout": bounded_timeout(default_timeout)}
+
+    response = await create(messages=messages, max_tokens=token_budget.max_tokens(key, ceiling), **timed(params))
+    choice = response.choices[0]
+    parts = [choice.message.content or ""]
+    produced = _completion_tokens(response)
+    continuations = 0
+    overhead = 0
+    continue_messages, continue_params = messages, params
+    if choice.finish_reason == "length" and follow_up is not None:
+        continue_messages, continue_params = follow_up(response)
+
+    while (
+        choice.finish_reason == "length"
+        and continuations < Config.TOKEN_BUDGET_MAX_CONTINUATIONS
+        and produced < ceiling
+    ):
+        continuations += 1
+        overhead += ceiling - produced
+        continuation = await create(
+            messages=continue_messages + [
+                {"role": "assistant", "content": "".join(parts)},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ],
+            max_tokens=ceiling - produced,
+            **timed(continue_params)
+        )
+        choice = continuation.choices[0]
+        parts.append(choice.message.content or "")
+        produced += _completion_tokens(continuation)
+        if continuation.usage is not None:
+            overhead += continuation.usage.prompt_tokens
+        if response.usage is not None and continuation.usage is not None:
+            response.usage.prompt_tokens += continuation.usage.prompt_tokens
+            response.usage.completion_tokens += continuation.usage.completion_tokens
+            response.usage.total_tokens += continuation.usage.total_tokens
+
+    if continuations:
+        logger.info(f"Continued {'/'.join(str(part) for part in key if part)} {continuations} time(s), {produced} tokens total")
+        response.choices[0].message.content = "".join(parts)
+        response.choices[0].finish_reason = choice.finish_reason
+
+    token_budget.record(key, produced, continuations, truncated=choice.finish_reason == "length", overhead_tokens=overhead)
+    return response
@@ -0,0 +1,182 @@
+# utils/traffic_capture.py
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Free text is replaced by filler of the same length so replayed traffic keeps
+# its real payload sizes (and roughly its token counts) without user content
+_REDACTED_KEYS = {"content", "text", "reference", "messages"}
+_KEPT_KEYS = {"role"}
+_DROPPED_KEYS = {"api-key", "api_key", "key", "token", "password", "authorization"}
+_FILLER = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+_MAX_PLAIN_STRING = 64
+_SKIPPED_PATHS = ("/metrics", "/admin", "/health")
+
+_upstream_calls: ContextVar[Optional[list]] = ContextVar("captured_upstream_calls", default=None)
+_write_lock = threading.Lock()
+
+
+def _filler(length: int) -> str:
+    repeats = length // len(_FILLER) + 1
+    return (_FILLER * repeats)[:length]
+
+
+def sanitize(value, redact: bool = False):
+    """Strip secrets and user text from a JSON body while keeping its shape and sizes"""
+    if isinstance(value, dict):
+        return {
+            key: sanitize(item, (redact or key in _REDACTED_KEYS) and key not in _KEPT_KEYS)
+            for key, item in value.items()
+            if key.lower() not in _DROPPED_KEYS
+        }
+    if isinstance(value, list):
+        return [sanitize(item, redact) for item in value]
+    if isinstance(value, str) and (redact or len(value) > _MAX_PLAIN_STRING):
+        return _filler(len(value))
+    return value
+
+
+def _request_start_hook(upstream: str):
+    async def hook(request):
+        if _upstream_calls.get() is not None:
+            request.extensions["capture_started"] = time.monotonic()
+    return hook
+
+
+def _response_hook(upstream: str):
+    async def hook(response):
+        calls = _upstream_calls.get()
+        started = response.request.extensions.get("capture_started")
+        if calls is None or started is None:
+            return
+        calls.append({
+            "upstream": upstream,
+            "method": response.request.method,
+            "path": response.request.url.path,
+            "status": response.status_code,
+            # Time to response headers: the whole call for JSON APIs, the
+            # time to first token for streamed completions
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "response_bytes": int(response.headers.get("content-length") or 0),
+        })
+    return hook
+
+
+def upstream_event_hooks(upstream: str) -> dict:
+    """httpx event hooks that record upstream timings for captured requests"""
+    return {"request": [_request_start_hook(upstream)], "response": [_response_hook(upstream)]}
+
+
+def record_upstream_call(upstream: str, latency_ms: float, **details):
+    """Record a non-HTTP upstream call (e.g. the Speech SDK) for the current captured request"""
+    calls = _upstream_calls.get()
+    if calls is not None:
+        calls.append({"upstream": upstream, "latency_ms": round(latency_ms, 1), **details})
+
+
+def _append(path: str, line: str):
+    with _write_lock:
+        if os.path.exists(path) and os.path.getsize(path) >= Config.TRAFFIC_CAPTURE_MAX_FILE_BYTES:
+            return
+        with open(path, "a") as f:
+            f.write(line)
+
+
+class TrafficCaptureMiddleware:
+    """
+    Opt-in ASGI middleware that writes a sample of requests to a JSONL file
+    for `tools/replay_traffic.py`: sanitized request bodies, response status,
+    size and timings, and the upstream calls each request made.
+
+    Enabled by setting TRAFFIC_CAPTURE_PATH. Bodies over
+    TRAFFIC_CAPTURE_MAX_BODY_BYTES are not recorded, and capture stops once the
+    file reaches TRAFFIC_CAPTURE_MAX_FILE_MB.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(_SKIPPED_PATHS)
+            or random.random() >= Config.TRAFFIC_CAPTURE_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        body_truncated = False
+        status = None
+        response_bytes = 0
+        first_byte = None
+        started_at = time.time()
+        start = time.monotonic()
+
+        async def capturing_receive():
+            nonlocal body_truncated
+            message = await receive()
+            if message["type"] == "http.request" and not body_truncated:
+                body.extend(message.get("body", b""))
+                if len(body) > Config.TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                    body_truncated = True
+                    body.clear()
+            return message
+
+        async def capturing_send(message):
+            nonlocal status, response_bytes, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                if first_byte is None:
+                    first_byte = time.monotonic()
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        token = _upstream_calls.set([])
+        calls = _upstream_calls.get()
+        try:
+            await self.app(scope, capturing_receive, capturing_send)
+        except Exception:
+            # The error response is rendered further out, by Starlette
+            status = status or 500
+            raise
+        finally:
+            _upstream_calls.reset(token)
+            record = {
+                "ts": started_at,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode(),
+                "body": self._sanitized_body(bytes(body)),
+                "body_truncated": body_truncated,
+                "status": status,
+                "duration_ms": round((time.monotonic() - start) * 1000, 1),
+                "ttfb_ms": round((first_byte - start) * 1000, 1) if first_byte else None,
+                "response_bytes": response_bytes,
+                "upstream_calls": calls,
+            }
+            try:
+                await asyncio.to_thread(_append, Config.TRAFFIC_CAPTURE_PATH, json.dumps(record) + "\n")
+            except OSError as e:
+                logger.warning(f"Failed to write traffic capture: {e}")
+
+    @staticmethod
+    def _sanitized_body(body: bytes):
+        if not body:
+            return None
+        try:
+            return sanitize(json.loads(body))
+        except ValueError:
+            return {"non_json_bytes": len(body)}